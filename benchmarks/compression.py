@@ -0,0 +1,53 @@
+"""Compares bytes received and latency of large REST responses with and without compressed transfer.
+
+The local MockServer simulates a download bandwidth, so bandwidth savings show up as latency.
+Its synthetic payloads are more repetitive than real ones, so they compress better than responses of the exchange:
+
+    python benchmarks/compression.py
+"""
+from time import perf_counter
+
+from latoken.client import LatokenClient
+from latoken.mock import MockServer, mockId
+
+
+REQUESTS = 20
+
+# Bytes per second, about a 50 Mbit/s link
+BANDWIDTH = 6250000
+
+PAIR = f'{mockId(4)}/{mockId(0)}'
+
+CALLS = {
+    'getOrderbook(limit=1000)': lambda latoken: latoken.getOrderbook(PAIR, limit = 1000),
+    'getCurrencies()': lambda latoken: latoken.getCurrencies(),
+    'getActivePairs()': lambda latoken: latoken.getActivePairs(),
+    'getTickers()': lambda latoken: latoken.getTickers()
+}
+
+
+def measure(server: MockServer, call, compression: bool) -> dict:
+    with LatokenClient(baseAPI = server.baseAPI, compression = compression) as latoken:
+        started = perf_counter()
+        for _ in range(REQUESTS):
+            call(latoken)
+        latency = (perf_counter() - started) / REQUESTS * 1000
+        transfer = latoken.transfer.getMetrics()
+
+    return {'latency_ms': latency, 'bytes': transfer['compressed_bytes'] // REQUESTS}
+
+
+def run() -> dict:
+    results = {'bandwidth': BANDWIDTH}
+    with MockServer(bandwidth = BANDWIDTH) as server:
+        for name, call in CALLS.items():
+            before = measure(server, call, compression = False)
+            after = measure(server, call, compression = True)
+            print(f'{name:<26} {before["bytes"]:>9} -> {after["bytes"]:>8} bytes   '
+                  f'{before["latency_ms"]:>7.1f} -> {after["latency_ms"]:>6.1f} ms')
+            results[name] = {'uncompressed': before, 'compressed': after}
+    return results
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,48 @@
+"""Compares decode throughput of the stdlib json module and orjson on exchange-sized payloads.
+
+    python benchmarks/decode.py
+"""
+import json
+from time import perf_counter
+
+from latoken.decoder import orjson
+
+
+ROUNDS = 200
+
+level = {'price': '46566.69', 'quantity': '0.0081', 'cost': '377.190189', 'accumulated': '377.190189'}
+orderbook = json.dumps({'ask': [level] * 1000, 'bid': [level] * 1000, 'totalAsk': '3.4354', 'totalBid': '204967.154792'}).encode()
+
+currency = {
+    'id': '92151d82-df98-4d88-9a4d-284fa9eca49f', 'status': 'CURRENCY_STATUS_ACTIVE', 'type': 'CURRENCY_TYPE_CRYPTO',
+    'name': 'Bitcoin', 'tag': 'BTC', 'description': '', 'logo': '', 'decimals': 8, 'created': 1572912000000,
+    'tier': 1, 'assetClass': 'ASSET_CLASS_UNKNOWN', 'minTransferAmount': 0
+}
+currencies = json.dumps([currency] * 3000).encode()
+
+
+def measure(name: str, loads, payload: bytes) -> float:
+    started = perf_counter()
+    for _ in range(ROUNDS):
+        loads(payload)
+    rate = ROUNDS * len(payload) / (perf_counter() - started) / 2 ** 20
+    print(f'{name:<35} {rate:>10.1f} MB/s')
+    return rate
+
+
+def run() -> dict:
+    decoders = {'json.loads': json.loads}
+    if orjson is not None:
+        decoders['orjson.loads'] = orjson.loads
+    else:
+        print('orjson is not installed, only the stdlib decoder is measured')
+
+    results = {'unit': 'MB/s'}
+    for payload_name, payload in (('getOrderbook(limit=1000)', orderbook), ('getCurrencies()', currencies)):
+        print(f'{payload_name}: {len(payload) / 1024:.0f} KB')
+        results[payload_name] = {name: measure(name, loads, payload) for name, loads in decoders.items()}
+    return results
+
+
+if __name__ == '__main__':
+    run()
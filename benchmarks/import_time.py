@@ -0,0 +1,76 @@
+"""Measures cold import time of the client modules in fresh interpreters and checks it against a budget.
+
+Streaming and transport dependencies are imported on first use, so importing latoken.client must not load them.
+Exits with status 1 if the budget is exceeded or any of them is loaded, so it can guard against regressions in CI:
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --budget 30
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+RUNS = 15
+
+# Milliseconds of `import latoken.client` (median of cumulative -X importtime), orjson takes about a half of it
+BUDGET_MS = 50
+
+MODULES = ('latoken.client', 'latoken.helpers', 'latoken.async_client')
+
+# Modules that should only be imported once REST requests are sent or streams are connected
+DEFERRED = ('asyncio', 'requests', 'urllib3', 'stomper', 'websocket', 'concurrent.futures', 'aiohttp', 'numpy')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def python(code: str, *options) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH = os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+    # Bytecode is written and reused as in installed packages, otherwise the time to compile sources is measured
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    return subprocess.run([sys.executable, *options, '-c', code], env = env, capture_output = True, text = True,
+                          check = True)
+
+
+def importTime(module: str) -> float:
+    """Returns median milliseconds of importing the module, including everything it imports"""
+
+    python(f'import {module}')  # Warming up the bytecode cache
+
+    times = []
+    for _ in range(RUNS):
+        output = python(f'import {module}', '-X', 'importtime').stderr
+        line = next(line for line in reversed(output.splitlines()) if line.rstrip().endswith(f'| {module}'))
+        times.append(int(line.split('|')[1]) / 1000)
+    return statistics.median(times)
+
+
+def deferredModules(module: str) -> list:
+    """Returns deferred modules that are loaded by importing the module"""
+
+    code = f'import json, sys, {module}; print(json.dumps([name for name in {DEFERRED!r} if name in sys.modules]))'
+    return json.loads(python(code).stdout)
+
+
+def run(budget: float = BUDGET_MS) -> dict:
+    results = {'unit': 'ms', 'budget': budget}
+    for module in MODULES:
+        results[module] = importTime(module)
+        print(f'import {module:<24} {results[module]:>7.1f} ms')
+
+    results['deferred_loaded'] = deferredModules('latoken.client')
+    results['passed'] = results['latoken.client'] <= budget and not results['deferred_loaded']
+
+    if results['deferred_loaded']:
+        print(f'latoken.client loads deferred modules: {", ".join(results["deferred_loaded"])}')
+    print(f'budget of {budget} ms: {"passed" if results["passed"] else "FAILED"}')
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--budget', type = float, default = BUDGET_MS, help = 'milliseconds allowed for latoken.client')
+    sys.exit(0 if run(parser.parse_args().budget)['passed'] else 1)
@@ -0,0 +1,41 @@
+"""Compares REST requests/sec of one-off connections against the pooled client transport.
+
+Runs against the local MockServer, so no network access or API keys are needed:
+
+    python benchmarks/rest_throughput.py
+"""
+from time import perf_counter
+
+import requests
+
+from latoken.client import LatokenClient
+from latoken.mock import MockServer
+
+
+REQUESTS = 500
+
+
+def measure(name: str, call) -> float:
+    started = perf_counter()
+    for _ in range(REQUESTS):
+        call()
+    rate = REQUESTS / (perf_counter() - started)
+    print(f'{name:<30} {rate:>10.1f} req/s')
+    return rate
+
+
+def run() -> dict:
+    with MockServer() as server:
+        # Before: a fresh connection per call, as module-level requests.get does
+        before = measure('requests.get per call', lambda: requests.get(server.baseAPI + LatokenClient.time_call).json())
+
+        # After: every call goes through the client's pooled keep-alive session
+        with LatokenClient(baseAPI = server.baseAPI) as latoken:
+            after = measure('LatokenClient pooled session', latoken.getServerTime)
+
+    print(f'speedup: {after / before:.2f}x')
+    return {'requests_get_per_call': before, 'pooled_session': after, 'unit': 'req/s'}
+
+
+if __name__ == '__main__':
+    run()
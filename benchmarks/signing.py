@@ -0,0 +1,62 @@
+"""Compares sign-ops/sec of per-request HMAC keying against the pre-keyed Signer.
+
+    python benchmarks/signing.py
+"""
+import hashlib
+import hmac
+from time import perf_counter
+
+from latoken.client import LatokenClient
+from latoken.signer import Signer, serialize
+
+
+OPERATIONS = 200000
+
+apiSecret = b'a44444aa-4444-44a4-444a-44444a444aaa'
+endpoint = LatokenClient.order_place_call
+params = {
+    'baseCurrency': '92151D82-DF98-4D88-9A4D-284FA9ECA49F',
+    'quoteCurrency': '0C3A106D-BDE3-4C13-A26E-3FD2394529E5',
+    'side': 'BUY',
+    'condition': 'GOOD_TILL_CANCELLED',
+    'type': 'LIMIT',
+    'clientOrderId': 'my order 1',
+    'price': '30000.00',
+    'quantity': '0.035',
+    'timestamp': 1624373391929
+}
+
+
+def legacy():
+    # How _APIsigned used to sign: serializing by map(lambda) and keying HMAC on every request
+    serializeFunc = map(lambda it: it[0] + '=' + str(it[1]), params.items())
+    queryParams = '&'.join(serializeFunc)
+    return hmac.new(apiSecret, ('POST' + endpoint + queryParams).encode('ascii'), hashlib.sha512).hexdigest()
+
+
+signer = Signer(apiSecret)
+
+
+def prekeyed():
+    return signer.sign('POST' + endpoint + serialize(params))
+
+
+def measure(name: str, call) -> float:
+    started = perf_counter()
+    for _ in range(OPERATIONS):
+        call()
+    rate = OPERATIONS / (perf_counter() - started)
+    print(f'{name:<30} {rate:>12.0f} sign-ops/s')
+    return rate
+
+
+def run() -> dict:
+    assert legacy() == prekeyed()
+    before = measure('hmac.new per request', legacy)
+    after = measure('pre-keyed Signer', prekeyed)
+    print(f'speedup: {after / before:.2f}x')
+    return {'hmac_per_request': before, 'prekeyed_signer': after, 'unit': 'sign-ops/s'}
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,67 @@
+"""Compares frames/sec of stomper.unpack_frame and parseMessage on MESSAGE frames of the exchange streams.
+
+    python benchmarks/stomp_parser.py
+"""
+import json
+from time import perf_counter
+
+import stomper
+
+from latoken.stomp import parseMessage
+
+
+FRAMES = 20000
+
+# The best of several rounds is reported, so that other processes add less noise
+ROUNDS = 5
+
+trade = {'id': '5bde4a50-b327-4a31-9d29-21e3a5c3a1e8', 'timestamp': 1625754587893, 'baseCurrency': 'BTC',
+         'quoteCurrency': 'USDT', 'direction': None, 'price': '33887.75', 'quantity': '0.00025', 'cost': '8.4719375',
+         'order': 4, 'makerBuyer': False}
+level = {'price': '46566.69', 'quantity': '0.0081', 'cost': '377.190189', 'quantityChange': '0.0081',
+         'costChange': '377.190189'}
+
+
+def message(destination: str, payload) -> bytes:
+    body = json.dumps({'payload': payload, 'nonce': 0, 'timestamp': 1625754587893})
+    return (f'MESSAGE\ndestination:{destination}\nmessage-id:f5e4ab43-cb64-4c46-9ea8-1b57b4a3a7d0\n'
+            f'content-length:{len(body)}\nsubscription:0\n\n{body}\x00').encode()
+
+
+FRAMES_BY_STREAM = {
+    'trades, 1 trade': message('/v1/trade/BTC/USDT', [trade]),
+    'book, 10 levels per side': message('/v1/book/BTC/USDT', {'ask': [level] * 10, 'bid': [level] * 10}),
+    'book, 100 levels per side': message('/v1/book/BTC/USDT', {'ask': [level] * 100, 'bid': [level] * 100})
+}
+
+PARSERS = {
+    'stomper.unpack_frame': lambda data: stomper.unpack_frame(data.decode()),
+    'parseMessage, bytes': parseMessage,
+    'parseMessage, text': parseMessage
+}
+
+
+def measure(name: str, parse, data) -> float:
+    elapsed = []
+    for _ in range(ROUNDS):
+        started = perf_counter()
+        for _ in range(FRAMES):
+            parse(data)
+        elapsed.append(perf_counter() - started)
+    rate = FRAMES / min(elapsed)
+    print(f'{name:<35} {rate:>12.0f} frames/s')
+    return rate
+
+
+def run() -> dict:
+    results = {'unit': 'frames/s'}
+    for stream, data in FRAMES_BY_STREAM.items():
+        print(f'{stream}: {len(data)} bytes')
+        results[stream] = {
+            name: measure(name, parse, data.decode() if name.endswith('text') else data) for name, parse in PARSERS.items()
+        }
+    return results
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,177 @@
+"""Measures websocket messages/sec, order book updates/sec and event loop responsiveness of LatokenClient.connect.
+
+The local MockServer sends messages as fast as it can from a separate process, so the client is the bottleneck. While messages are consumed,
+a timer coroutine sleeps for 1 ms in a loop and its lag shows how long other coroutines wait for the event loop.
+
+Sharding is measured with one hot pair sent as fast as possible and COLD_PAIRS pairs at COLD_RATE messages/sec each:
+on a single connection frames of the cold pairs queue behind the hot one, with several connections they don't:
+
+    python benchmarks/streams.py
+"""
+import asyncio
+import statistics
+from time import perf_counter
+
+from latoken.client import LatokenClient
+from latoken.mock import spawnMockServer
+from latoken.stomp import StompConnection, ThreadedTransport
+
+
+SECONDS = 3
+
+TIMER_INTERVAL = 0.001
+
+COLD_PAIRS = 20
+
+COLD_RATE = 50
+
+
+class Finished(Exception):
+    pass
+
+
+async def legacyConnect(url: str, streams: list, on_message):
+    # How connect used to work: blocking websocket-client calls inside a coroutine
+    import stomper
+    import websocket
+
+    ws = websocket.create_connection(url)
+    ws.send(stomper.connect('', '', 'localhost'))
+    ws.recv()
+    for index, stream in enumerate(streams):
+        ws.send(stomper.subscribe(stream, index, ack = 'auto'))
+    try:
+        while True:
+            await on_message(stomper.unpack_frame(ws.recv().decode()))
+    finally:
+        ws.close()
+
+
+async def timer(lags: list):
+    while True:
+        expected = perf_counter() + TIMER_INTERVAL
+        await asyncio.sleep(TIMER_INTERVAL)
+        lags.append((perf_counter() - expected) * 1000)
+
+
+def measure(name: str, connect, on_message = None, message_levels: int = 10) -> dict:
+    """Runs connect(server, handler) for SECONDS, returns messages handled per second and lag of the timer"""
+
+    with spawnMockServer(message_rate = 0, message_levels = message_levels) as server:
+        count = 0
+        started = None
+        lags = []
+
+        async def handler(message):
+            nonlocal count, started
+            if started is None:
+                started = perf_counter()
+            if on_message is not None:
+                on_message(message)
+            count += 1
+            if perf_counter() - started > SECONDS:
+                raise Finished
+
+        async def main():
+            task = asyncio.ensure_future(timer(lags))
+            try:
+                await connect(server, handler)
+            except Finished:
+                pass
+            finally:
+                task.cancel()
+
+        asyncio.run(main())
+        elapsed = perf_counter() - started
+
+    # A timer that never got the event loop waited for the whole run
+    lags = lags or [elapsed * 1000]
+    result = {
+        'messages_per_second': count / elapsed,
+        'timer_lag_p50_ms': statistics.median(lags),
+        'timer_lag_p99_ms': statistics.quantiles(lags, n = 100)[98] if len(lags) > 1 else lags[0],
+        'timer_lag_max_ms': max(lags)
+    }
+    print(f'{name:<42} {result["messages_per_second"]:>9.0f} msg/s   timer lag p50 {result["timer_lag_p50_ms"]:>7.2f} ms'
+          f'   p99 {result["timer_lag_p99_ms"]:>7.2f} ms   max {result["timer_lag_max_ms"]:>7.1f} ms')
+    return result
+
+
+def applyBook(book: dict, message: dict):
+    payload = message['body']['payload']
+    for side in ('ask', 'bid'):
+        levels = book[side]
+        for level in payload[side]:
+            if level['quantity'] == '0':
+                levels.pop(level['price'], None)
+            else:
+                levels[level['price']] = level['quantity']
+
+
+def measureSharding(connections: int) -> dict:
+    """Returns messages per second of the hot pair and of the cold pairs (with the share of their feed delivered)"""
+
+    hot = '/v1/trade/hot/usdt'
+    streams = [hot] + [f'/v1/trade/cold{number}/usdt' for number in range(COLD_PAIRS)]
+    counts = {'hot': 0, 'cold': 0}
+
+    async def handler(message):
+        counts['hot' if message['headers']['subscription'] == '0' else 'cold'] += 1
+
+    async def main(server):
+        latoken = LatokenClient(baseWS = server.baseWS)
+        options = dict(connections = connections, balance = 'rate', rebalance_interval = 1) if connections > 1 else {}
+        try:
+            await asyncio.wait_for(latoken.connect(streams = streams, on_message = handler, **options), SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+    with spawnMockServer(message_rate = COLD_RATE, message_rates = {hot: 0}) as server:
+        asyncio.run(main(server))
+
+    result = {
+        'hot_messages_per_second': counts['hot'] / SECONDS,
+        'cold_messages_per_second': counts['cold'] / SECONDS,
+        'cold_delivered': counts['cold'] / SECONDS / (COLD_PAIRS * COLD_RATE)
+    }
+    print(f'{f"connect, {connections} connection(s), 1 hot pair":<42} {result["hot_messages_per_second"]:>9.0f} msg/s   '
+          f'cold pairs {result["cold_messages_per_second"]:>6.0f} msg/s ({result["cold_delivered"]:.0%} of their feed)')
+    return result
+
+
+def run() -> dict:
+    trades = ['/v1/trade/a/b']
+    results = {'unit': 'msg/s, ms'}
+
+    results['blocking_websocket_client'] = measure(
+        'blocking websocket-client (before)', lambda server, handler: legacyConnect(server.baseWS, trades, handler)
+    )
+
+    async def threaded(server, handler):
+        connection = StompConnection(server.baseWS, handler, transport = ThreadedTransport)
+        await connection.subscribe(trades[0])
+        await connection.run()
+
+    results['threaded_transport'] = measure('StompConnection, threaded transport', threaded)
+    results['raw_messages'] = measure(
+        'connect, body not decoded',
+        lambda server, handler: LatokenClient(baseWS = server.baseWS).connect(streams = trades, on_message = handler)
+    )
+
+    book = {'ask': dict(), 'bid': dict()}
+    for levels in (10, 100):
+        results[f'book_updates_{levels}_levels'] = measure(
+            f'connect, book updates of {levels} levels per side',
+            lambda server, handler: LatokenClient(baseWS = server.baseWS).connect(
+                streams = ['/v1/book/a/b'], on_message = handler, decode = True
+            ),
+            on_message = lambda message: applyBook(book, message), message_levels = levels
+        )
+
+    for connections in (1, 4):
+        results[f'hot_pair_{connections}_connections'] = measureSharding(connections)
+    return results
+
+
+if __name__ == '__main__':
+    run()
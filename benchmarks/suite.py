@@ -0,0 +1,77 @@
+"""Runs all benchmarks against the local MockServer and writes the results as JSON, for tracking over releases.
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --only signing decode
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+from datetime import datetime, timezone
+from importlib.metadata import PackageNotFoundError, version
+
+# The client is imported from the source checkout if it is not installed
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compression
+import decode
+import import_time
+import rest_throughput
+import signing
+import stomp_parser
+import streams
+from latoken.decoder import orjson
+
+
+BENCHMARKS = {
+    'import_time': import_time.run,
+    'rest_throughput': rest_throughput.run,
+    'signing': signing.run,
+    'decode': decode.run,
+    'compression': compression.run,
+    'stomp_parser': stomp_parser.run,
+    'streams': streams.run
+}
+
+
+def environment() -> dict:
+    try:
+        client_version = version('latoken-api-v2-python-client')
+    except PackageNotFoundError:
+        client_version = None
+
+    return {
+        'client_version': client_version,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'orjson': orjson is not None,
+        'timestamp': datetime.now(timezone.utc).isoformat()
+    }
+
+
+def main(argv: list = None) -> dict:
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument('--output', help = 'JSON file to write the results to, printed if omitted')
+    parser.add_argument('--only', nargs = '+', choices = list(BENCHMARKS), help = 'benchmarks to run')
+    args = parser.parse_args(argv)
+
+    results = {'environment': environment(), 'results': dict()}
+    # Progress of the benchmarks goes to stderr, so that stdout only has the results
+    with contextlib.redirect_stdout(sys.stderr):
+        for name in args.only or BENCHMARKS:
+            print(f'## {name}')
+            results['results'][name] = BENCHMARKS[name]()
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent = 2)
+    else:
+        print(json.dumps(results, indent = 2))
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,7 @@ from sortedcontainers import SortedDict
 import json
 
 
-# There are 4 simple steps: initialisation, subscribing, dealing with data, running the script.
+# There are 4 simple steps: initialisation, dealing with data, subscribing, running the script.
 
 # Firstly, we create a client object.
 latoken = LatokenClient()
@@ -11,63 +11,50 @@ latoken = LatokenClient()
 # latoken = LatokenClient(apiKey = apiKey, apiSecret = apiSecret)
 
 
-# Secondly, we subscribe to streams we want. 
-# Let's say we want an orderbook of LA/USDT pair and tickers of LA/USDT and LA/ETH pairs in this example.
-# Note that you need to subscribe to different streams separately as in this example. Chaining doesn't work here.
-latoken.streamBook(pairs = [
-							'707ccdf1-af98-4e09-95fc-e685ed0ae4c6/0c3a106d-bde3-4c13-a26e-3fd2394529e5'
-							])
-latoken.streamPairTickers(pairs = [
-							'707ccdf1-af98-4e09-95fc-e685ed0ae4c6/0c3a106d-bde3-4c13-a26e-3fd2394529e5',
-							'707ccdf1-af98-4e09-95fc-e685ed0ae4c6/620f2019-33c0-423b-8a9d-cde4d7f8ef7f'
-							])
+# Secondly, we write functions that contain what we want to do with the received data, one for each kind of stream.
+# These functions must be async!
+# Order book is kept between messages, the stream sends changes of price levels
+order_book = {"bid": SortedDict(), "ask": SortedDict()}
 
 
-# Thirdly, we write a function that contains what we want to do with the received data.
-# This function must me async!
-async def consumer(message):
-	# Create orderbook template
-	order_book = {"bid": SortedDict(), "ask": SortedDict()}
+async def onBook(message):
+	# With decoder = True payload of book messages has lists of BookLevel records (see latoken.models)
+	# and their numeric fields are Decimals
+	for side in ("ask", "bid"):
+		for level in message['body']['payload'][side]:
+			order_book[side][level.price] = order_book[side].get(level.price, 0) + level.quantityChange
+	print(f'LA/USDT orderbook is: {order_book}')
 
-	# Creating a function that would construct and undate an ordered orderbook
-	def updateOrderbook(order_book: dict, event: dict) -> dict:
-		"""Updates orderbook with new data
-		"""
 
-		for side in ("ask", "bid"):
-			for entry in event[side]:
-				price = float(entry["price"])
-				quantity_change = float(entry["quantityChange"])
-				order_book[side].setdefault(price, 0)
-				order_book[side][price] += float(quantity_change)
+# Let's imagine we want to know 24 hours change and last price of LA/USDT and LA/ETH pairs.
+# Both pairs are routed to the same function, destination header tells them apart.
+async def onTicker(message):
+	ticker = message['body']['payload']
+	print(f'{message["headers"]["destination"]} last price was: {ticker.lastPrice}')
+	print(f'{message["headers"]["destination"]} 24 hours change was: {ticker.change24h}%')
 
-		return order_book
 
-	# Insert received data into our orderbook object.
-	# Each topic that we subscribe to is assigned a number in the order of subscription starting from 0.
-	# 'body' part of the message returns string, so we need to load it as json
-	if len(message['headers']) != 0:
-		if message['headers']['subscription'] == '0':  # We subscribed to LA/USDT orderbook first, so subscription is 0.
-			order_book = updateOrderbook(order_book, json.loads(message['body'])['payload'])
-			print(f'LA/USDT orderbook is: {order_book}')
+# Messages of streams that were subscribed to without a handler are passed to on_message of connect.
+# 'body' part of such messages is a string, so we need to load it as json (or connect with decode = True)
+async def consumer(message):
+	print(json.loads(message['body']))
 
-		# Let's imagine we want to know 24 hours change and last price of LA/USDT and LA/ETH pairs.
-		if message['headers']['subscription'] == '1':
-			la_usdt_24h_change = json.loads(message['body'])['payload']['change24h']
-			la_usdt_last_price = json.loads(message['body'])['payload']['lastPrice']
-			print(f'LA/USDT last price was: {la_usdt_last_price}')
-			print(f'LA/USDT 24 hours change was: {la_usdt_24h_change}%')
 
-		if message['headers']['subscription'] == '2':
-			la_eth_24h_change = json.loads(message['body'])['payload']['change24h']
-			la_eth_last_price = json.loads(message['body'])['payload']['lastPrice']
-			print(f'LA/ETH last price was: {la_eth_last_price}')
-			print(f'LA/ETH 24 hours change was: {la_eth_24h_change}%')
+# Thirdly, we subscribe to streams we want and pass a handler for each of them.
+# Let's say we want an orderbook of LA/USDT pair and tickers of LA/USDT and LA/ETH pairs in this example.
+# Note that you need to subscribe to different streams separately as in this example. Chaining doesn't work here.
+latoken.streamBook(pairs = [
+							'707ccdf1-af98-4e09-95fc-e685ed0ae4c6/0c3a106d-bde3-4c13-a26e-3fd2394529e5'
+							], handler = onBook, decoder = True)
+latoken.streamPairTickers(pairs = [
+							'707ccdf1-af98-4e09-95fc-e685ed0ae4c6/0c3a106d-bde3-4c13-a26e-3fd2394529e5',
+							'707ccdf1-af98-4e09-95fc-e685ed0ae4c6/620f2019-33c0-423b-8a9d-cde4d7f8ef7f'
+							], handler = onTicker, decoder = True)
+latoken.streamTickers()
 
 
 # Finally, we launch the connection and run the code.
-# Don't forget to put the async function as on_message argument.
+# Don't forget to put the async function as on_message argument for streams without a handler.
 latoken.run(latoken.connect(on_message = consumer))
 # OR (if you want to use private endpoints, you will need to set signed = True)
 # latoken.run(latoken.connect(signed = True, on_message = consumer))
-
@@ -0,0 +1,34 @@
+def candlesToArrays(candles: dict) -> dict:
+    """Converts getCandles response into NumPy arrays in one vectorised pass per column
+
+    Requires numpy to be installed.
+
+    :returns: dict - dict with int64 array of times in seconds and float64 arrays of prices and volumes
+
+    .. code block:: python
+
+        {
+            't': array([1630800000, ..., 1630828800]),
+            'o': array([49926.32, ..., 49853.58]),
+            'c': array([50193.23, ..., 49948.57]),
+            'l': array([49777.0, ..., 49810.2]),
+            'h': array([50555.0, ..., 49997.35]),
+            'v': array([2257782.6961564, ..., 811505.2694684])
+        }
+
+    """
+
+    import numpy
+
+    status = candles.get('s')
+    if status == 'no_data':
+        arrays = {column: numpy.empty(0, dtype = numpy.float64) for column in 'oclhv'}
+        arrays['t'] = numpy.empty(0, dtype = numpy.int64)
+        return arrays
+
+    if status != 'ok':
+        raise ValueError(f'Candles are not returned, status: {status}, response: {candles}')
+
+    arrays = {column: numpy.array(candles[column], dtype = numpy.float64) for column in 'oclhv'}
+    arrays['t'] = numpy.array(candles['t'], dtype = numpy.int64)
+    return arrays
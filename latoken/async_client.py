@@ -0,0 +1,292 @@
+import asyncio
+from collections import deque
+from time import perf_counter, time
+from typing import Callable, Optional, Union
+
+import aiohttp
+
+from latoken.backfill import CandleCache, candleWindows, mergeCandles
+from latoken.client import LatokenClient
+from latoken.compression import ACCEPT_ENCODING
+from latoken.history import HistoryCursor
+from latoken.ratelimit import LANE_PUBLIC
+
+
+class AsyncLatokenClient(LatokenClient):
+    """Asyncio version of LatokenClient
+
+    Every REST method of LatokenClient is available under the same name and with the same arguments,
+    but returns a coroutine that is sent through a non-blocking pooled aiohttp session:
+
+    .. code block:: python
+
+        async with AsyncLatokenClient(apiKey = apiKey, apiSecret = apiSecret) as latoken:
+            orderbook = await latoken.getOrderbook('BTC/USDT')
+
+    """
+
+    # TRANSPORT
+
+    def _createSession(self) -> None:
+        # aiohttp sessions must be created inside a running event loop, so it is done on the first request
+        return None
+
+    def _connector(self) -> aiohttp.TCPConnector:
+        return aiohttp.TCPConnector(
+            limit = self.pool_connections * self.pool_maxsize,
+            limit_per_host = self.pool_maxsize,
+            force_close = not self.keep_alive
+        )
+
+    def _traceConfig(self) -> aiohttp.TraceConfig:
+        """Timing dns and connect phases of instrumented requests, connect includes dns until it is taken out"""
+
+        def timer(phase: str):
+            async def start(session, context, params):
+                if context.trace_request_ctx is not None:
+                    context.trace_request_ctx['_' + phase] = perf_counter()
+
+            async def end(session, context, params):
+                if context.trace_request_ctx is not None and '_' + phase in context.trace_request_ctx:
+                    started = context.trace_request_ctx.pop('_' + phase)
+                    context.trace_request_ctx[phase] = (perf_counter() - started) * 1000
+
+            return start, end
+
+        traceConfig = aiohttp.TraceConfig()
+        dnsStart, dnsEnd = timer('dns')
+        traceConfig.on_dns_resolvehost_start.append(dnsStart)
+        traceConfig.on_dns_resolvehost_end.append(dnsEnd)
+        connectStart, connectEnd = timer('connect')
+        traceConfig.on_connection_create_start.append(connectStart)
+        traceConfig.on_connection_create_end.append(connectEnd)
+        return traceConfig
+
+    def _ensureSession(self):
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector = self._connector(),
+                timeout = aiohttp.ClientTimeout(total = self.timeout),
+                headers = {'Accept-Encoding': ACCEPT_ENCODING if self.compression else 'identity'},
+                trace_configs = [self._traceConfig()] if self.instrumentation is not None else None
+            )
+
+    async def _APIrequest(self, url: str, request_type: Optional[str] = 'get', headers: Optional[dict] = None,
+                          json: Optional[dict] = None, lane: Optional[str] = LANE_PUBLIC, phases: Optional[dict] = None):
+        """Sending a request through the pooled aiohttp session, all REST calls end up here"""
+
+        if self.instrumentation is not None:
+            return await self._APIrequestTimed(url, request_type, headers, json, lane, phases or dict())
+
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquireAsync(lane)
+
+        self._ensureSession()
+
+        if request_type == 'get':
+            async with self.session.get(url, headers = headers) as response:
+                content = await response.read()
+
+        elif request_type == 'post':
+            async with self.session.post(url, headers = headers, json = json) as response:
+                content = await response.read()
+
+        self._recordTransfer(response, content)
+
+        if self.raw:
+            return content
+
+        return self.json_loads(content)
+
+    async def _APIrequestTimed(self, url: str, request_type: str, headers: Optional[dict], json: Optional[dict],
+                               lane: str, phases: dict):
+        """Same as _APIrequest, but each phase is timed and recorded by the instrumentation"""
+
+        started = perf_counter()
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquireAsync(lane)
+            phases['queue'] = (perf_counter() - started) * 1000
+
+        self._ensureSession()
+        sent = perf_counter()
+        if request_type == 'get':
+            request = self.session.get(url, headers = headers, trace_request_ctx = phases)
+
+        elif request_type == 'post':
+            request = self.session.post(url, headers = headers, json = json, trace_request_ctx = phases)
+
+        async with request as response:
+            received = perf_counter()
+            content = await response.read()
+            downloaded = perf_counter()
+        self._recordTransfer(response, content)
+
+        decoded = content if self.raw else self.json_loads(content)
+        finished = perf_counter()
+
+        if 'connect' in phases:
+            phases['connect'] = max(phases['connect'] - phases.get('dns', 0.0), 0.0)
+        phases['ttfb'] = (received - sent) * 1000 - phases.get('dns', 0.0) - phases.get('connect', 0.0)
+        phases['download'] = (downloaded - received) * 1000
+        if not self.raw:
+            phases['decode'] = (finished - downloaded) * 1000
+        phases['total'] = (finished - started) * 1000 + phases.get('sign', 0.0)
+
+        self.instrumentation.record(self._callTemplate(url), phases)
+        return decoded
+
+    def _recordTransfer(self, response: aiohttp.ClientResponse, content: bytes):
+        """Counting bytes received over the wire, older aiohttp only reports them by Content-Length"""
+
+        compressed = getattr(response.content, 'total_raw_bytes', None)
+        if compressed is None:
+            compressed = int(response.headers.get('Content-Length', len(content)))
+        self.transfer.record(response.headers.get('Content-Encoding'), compressed, len(content))
+
+    async def _postprocess(self, response, function):
+        """Applying a function to the decoded response, asyncio client applies it once the response is awaited"""
+
+        return function(await response)
+
+    async def _APIpublic(self, endpoint: str):
+        """Sending public calls, endpoint may already contain query params"""
+
+        if self.cache is not None and endpoint in self.cache:
+            return await self.cache.getAsync(endpoint, lambda: self._APIrequest(self.baseAPI + endpoint))
+
+        return await self._APIrequest(self.baseAPI + endpoint)
+
+    def __enter__(self):
+        # The inherited synchronous context manager would not await close and leak the session
+        raise TypeError('AsyncLatokenClient should be used with "async with", not "with"')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def close(self):
+        """Closes all pooled connections of the client"""
+
+        self.stopClockSync()
+        if self.session is not None:
+            await self.session.close()
+
+    # CLOCK
+
+    async def syncClock(self, samples: int = 5) -> dict:
+        """Same as LatokenClient.syncClock"""
+
+        for _ in range(samples):
+            sent = time() * 1000
+            response = self._decode(await self.getServerTime())
+            self.clock.addSample(sent, response['serverTime'], time() * 1000)
+
+        return {'offset': self.clock.offset, 'rtt': self.clock.rtt}
+
+    def startClockSync(self, interval: float = 60, samples: int = 5):
+        """Starts syncing the clock in a task every interval seconds, must be called inside a running event loop"""
+
+        async def loop():
+            while True:
+                try:
+                    await self.syncClock(samples = samples)
+                except Exception:
+                    pass
+                await asyncio.sleep(interval)
+
+        self.stopClockSync()
+        self._clockSync = asyncio.ensure_future(loop())
+
+    def stopClockSync(self):
+        if self._clockSync is not None:
+            self._clockSync.cancel()
+            self._clockSync = None
+
+    # BATCH REQUESTS
+
+    async def _pipeline(self, method, calls: list, max_workers: Optional[int] = None) -> list:
+        """Gathering a method with each dict of keyword arguments with at most max_workers requests in flight
+
+        Results are returned in the order of calls, an exception raised by a call is returned as its result
+        """
+
+        semaphore = asyncio.Semaphore(max_workers or self.pool_maxsize)
+
+        async def call(kwargs):
+            async with semaphore:
+                try:
+                    return await method(**kwargs)
+                except Exception as error:
+                    return error
+
+        return await asyncio.gather(*[call(kwargs) for kwargs in calls])
+
+    async def getCandlesHistory(self, start: int, end: int, pair: str, resolution: str = '1h',
+                                max_workers: Optional[int] = None, cache_path: Optional[str] = None) -> dict:
+        """Same as LatokenClient.getCandlesHistory, windows are gathered with at most max_workers requests in flight"""
+
+        pathParams = self._inputController(pair = pair)
+        cache = CandleCache(cache_path) if cache_path else None
+        semaphore = asyncio.Semaphore(max_workers or self.pool_maxsize)
+
+        async def fetch(window):
+            if cache is not None:
+                candles = cache.load(pathParams, resolution, window)
+                if candles is not None:
+                    return candles
+
+            async with semaphore:
+                candles = await self.getCandles(window[0], window[1], pair = pair, resolution = resolution, as_arrays = True)
+            if cache is not None:
+                cache.store(pathParams, resolution, window, candles)
+            return candles
+
+        windows = await asyncio.gather(*[fetch(window) for window in candleWindows(start, end, resolution)])
+        return mergeCandles(windows, start, end)
+
+    # PAGINATION
+
+    async def _paginate(self, method, size: int, prefetch: int):
+        """Yielding records of all pages, while the next pages are requested as tasks"""
+
+        pending = deque(asyncio.ensure_future(method(page = page, size = size)) for page in range(prefetch + 1))
+        next_page = prefetch + 1
+        try:
+            while pending:
+                response = self._decode(await pending.popleft())
+
+                if response.get('hasNext'):
+                    pending.append(asyncio.ensure_future(method(page = next_page, size = size)))
+                    next_page += 1
+
+                for record in response['content']:
+                    yield record
+
+                if not response.get('hasNext'):
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+
+    # HISTORY
+
+    async def _walkHistory(self, method, since: Optional[int], until: Optional[int], limit: int, **kwargs):
+        cursor = HistoryCursor(since = since, until = until, limit = limit)
+        while not cursor.done:
+            response = self._decode(await method(timestamp = cursor.timestamp, limit = limit, **kwargs))
+            for record in cursor.advance(response):
+                yield record
+
+    async def _collect(self, records) -> list:
+        return [record async for record in records]
+
+    # WEBSOCKETS
+
+    async def _userStream(self, stream: str, handler: Optional[Callable] = None,
+                          decoder: Union[bool, Callable, None] = None):
+        """Private streams are addressed by the id of the authenticated user"""
+
+        user_info = self._decode(await self.getUserInfo())
+        return self._addStream(stream, handler, decoder, user = str(user_info['id']))
@@ -0,0 +1,78 @@
+import os
+from time import time
+from typing import Optional
+
+from latoken.arrays import candlesToArrays
+from latoken.enums import CANDLE_INTERVAL_SECONDS
+
+
+# Number of candles requested at once, ranges are split into windows of this many candles
+CANDLES_PER_REQUEST = 1000
+
+COLUMNS = ('t', 'o', 'c', 'l', 'h', 'v')
+
+
+def candleWindows(start: int, end: int, resolution: str, size: int = CANDLES_PER_REQUEST) -> list:
+    """Splits [start, end) into windows aligned to multiples of size candles, so the same windows are cached on every run
+
+    :returns: list - list of (window start, window end) tuples in seconds
+    """
+
+    length = CANDLE_INTERVAL_SECONDS[resolution] * size
+    first = int(start) // length * length
+    return [(window, window + length) for window in range(first, int(end), length)]
+
+
+def mergeCandles(windows: list, start: int, end: int) -> dict:
+    """Concatenates candle arrays of windows, keeping candles in [start, end) sorted and de-duplicated by "t" """
+
+    import numpy
+
+    if not windows:
+        return candlesToArrays({'s': 'no_data'})
+
+    t = numpy.concatenate([window['t'] for window in windows])
+    t, index = numpy.unique(t, return_index = True)
+    keep = (t >= int(start)) & (t < int(end))
+
+    merged = {'t': t[keep]}
+    for column in COLUMNS[1:]:
+        merged[column] = numpy.concatenate([window[column] for window in windows])[index][keep]
+    return merged
+
+
+class CandleCache:
+    """On-disk cache of candle windows, one .npz file of column arrays per window
+
+    Only windows that are entirely in the past are stored, as their candles don't change anymore.
+
+    :param path: directory of the cache, created if missing
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _file(self, pair: dict, resolution: str, window: tuple) -> str:
+        return os.path.join(self.path, '{currency}_{quote}'.format(**pair), resolution, f'{window[0]}.npz')
+
+    def load(self, pair: dict, resolution: str, window: tuple) -> Optional[dict]:
+        import numpy
+
+        try:
+            with numpy.load(self._file(pair, resolution, window)) as stored:
+                return {column: stored[column] for column in COLUMNS}
+        except FileNotFoundError:
+            return None
+
+    def store(self, pair: dict, resolution: str, window: tuple, candles: dict):
+        import numpy
+
+        if window[1] + CANDLE_INTERVAL_SECONDS[resolution] > time():
+            return
+
+        file = self._file(pair, resolution, window)
+        os.makedirs(os.path.dirname(file), exist_ok = True)
+        # Written under a temporary name first, so that concurrent readers never see a partial file
+        temporary = file + '.tmp.npz'
+        numpy.savez(temporary, **candles)
+        os.replace(temporary, file)
@@ -0,0 +1,137 @@
+import threading
+from time import monotonic
+from typing import Optional
+
+
+class ResponseCache:
+    """TTL cache of REST responses keyed by endpoint
+
+    A response younger than the endpoint TTL is returned without a request. A response that expired less
+    than stale seconds ago is still returned, while a fresh one is fetched in the background.
+    Older responses are fetched again before returning.
+
+    Cached responses are shared between callers, so they should not be modified in place.
+
+    :param ttls: dict with endpoints as keys and TTLs in seconds as values, other endpoints are not cached
+    :param stale: optional, seconds after expiry during which a stale response is served, defaults to 60
+
+    .. code block:: python
+
+        latoken = LatokenClient(cache = ResponseCache({LatokenClient.active_pairs_call: 60}))
+
+    """
+
+    def __init__(self, ttls: dict, stale: Optional[float] = 60):
+        self.ttls = dict(ttls)
+        self.stale = stale
+        self.entries = dict()  # endpoint: (expiry, response)
+        self.refreshing = set()
+        self._tasks = set()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self._lock = threading.Lock()
+
+    def __contains__(self, endpoint: str) -> bool:
+        return endpoint in self.ttls
+
+    def _lookup(self, endpoint: str):
+        """Returns cached response and whether it should be refreshed in the background, None if it should be fetched"""
+
+        with self._lock:
+            entry = self.entries.get(endpoint)
+            now = monotonic()
+
+            if entry is None or now > entry[0] + self.stale:
+                self.misses += 1
+                return None
+
+            if now <= entry[0]:
+                self.hits += 1
+                return entry[1], False
+
+            self.stale_hits += 1
+            refresh = endpoint not in self.refreshing
+            self.refreshing.add(endpoint)
+            return entry[1], refresh
+
+    def _store(self, endpoint: str, response):
+        with self._lock:
+            self.entries[endpoint] = (monotonic() + self.ttls[endpoint], response)
+            self.refreshing.discard(endpoint)
+        return response
+
+    def _failed(self, endpoint: str):
+        with self._lock:
+            self.refreshing.discard(endpoint)
+
+    def get(self, endpoint: str, fetch):
+        """Returns cached response of the endpoint, fetch is called when a new one is needed"""
+
+        cached = self._lookup(endpoint)
+        if cached is None:
+            return self._store(endpoint, fetch())
+
+        response, refresh = cached
+        if refresh:
+            def revalidate():
+                try:
+                    self._store(endpoint, fetch())
+                except Exception:
+                    self._failed(endpoint)
+
+            threading.Thread(target = revalidate, daemon = True).start()
+        return response
+
+    async def getAsync(self, endpoint: str, fetch):
+        """Same as get, but fetch returns a coroutine and background refresh runs as a task"""
+
+        cached = self._lookup(endpoint)
+        if cached is None:
+            return self._store(endpoint, await fetch())
+
+        response, refresh = cached
+        if refresh:
+            async def revalidate():
+                try:
+                    self._store(endpoint, await fetch())
+                except Exception:
+                    self._failed(endpoint)
+
+            import asyncio
+
+            task = asyncio.ensure_future(revalidate())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return response
+
+    def invalidate(self, endpoint: Optional[str] = None):
+        """Drops cached response of the endpoint, or all cached responses if endpoint is not given"""
+
+        with self._lock:
+            if endpoint is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(endpoint, None)
+
+    def getMetrics(self) -> dict:
+        """Returns cache counters
+
+        .. code block:: python
+
+            {
+                'hits': 1520,
+                'misses': 5,
+                'stale_hits': 3,
+                'entries': 5
+            }
+
+        """
+
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale_hits': self.stale_hits,
+                'entries': len(self.entries)
+            }
@@ -1,12 +1,24 @@
-import asyncio
-import hashlib
-import hmac
-from time import time
-from typing import Optional
-
-import stomper
-import websocket
-import requests
+import re
+import threading
+from collections import deque
+from time import perf_counter, time
+from typing import TYPE_CHECKING, Callable, Optional, Union
+
+from latoken.arrays import candlesToArrays
+from latoken.backfill import CandleCache, candleWindows, mergeCandles
+from latoken.cache import ResponseCache
+from latoken.clock import ServerClock
+from latoken.compression import ACCEPT_ENCODING, TransferMetrics
+from latoken.decoder import loads
+from latoken.history import HistoryCursor
+from latoken.instrumentation import Instrumentation, connectionPhases, splitConnectPhases, timedPoolClasses
+from latoken.models import Balance, Order, Ticker, Trade, bookDecoder, payloadDecoder
+from latoken.ratelimit import LANE_CANCEL, LANE_PRIVATE, LANE_PUBLIC, LANE_TRADING, RateLimiter
+from latoken.signer import Signer, serialize
+
+# requests, stomper and websocket are imported on first use, so that short-lived jobs don't pay for what they don't use
+if TYPE_CHECKING:
+    import requests
 
 
 class LatokenClient:
@@ -93,15 +105,292 @@ class LatokenClient:
 
     topics = list()
 
+    # Typed decoders of stream bodies (decoder = True of stream* methods), payloads become records of latoken.models
+    stream_decoders = {
+        book_stream: bookDecoder(),
+        trades_stream: payloadDecoder(Trade),
+        ticker_all_stream: payloadDecoder(Ticker),
+        tickers_pair_stream: payloadDecoder(Ticker),
+        orders_stream: payloadDecoder(Order),
+        account_stream: payloadDecoder(Balance)
+    }
+
+    # Default TTLs in seconds of cached reference data (when the client is created with cache = True)
+    reference_ttls = {
+        active_currency_call: 300,
+        quote_currency_call: 3600,
+        active_pairs_call: 300,
+        fee_levels_call: 3600,
+        bindings_active_call: 300
+    }
+
     # INITIALISATION
 
     def __init__(self, apiKey: Optional[str] = None, apiSecret: Optional[str] = None,
-                 baseAPI: str = baseAPI, baseWS: str = baseWS, topics: list = topics):
+                 baseAPI: str = baseAPI, baseWS: str = baseWS, topics: list = topics,
+                 pool_connections: int = 10, pool_maxsize: int = 10, keep_alive: bool = True,
+                 timeout: Optional[float] = None, rate_limiter: Optional[RateLimiter] = None,
+                 cache: Union[bool, ResponseCache] = False, json_loads: Optional[Callable] = None, raw: bool = False,
+                 instrumentation: Union[bool, Instrumentation] = False, compression: bool = True):
+        """
+        :param pool_connections: number of per-host connection pools kept by the transport
+        :param pool_maxsize: max number of connections kept alive to a single host
+        :param keep_alive: defaults to True (connections are reused between requests)
+        :param timeout: optional, seconds to wait for the server to connect and respond, defaults to None (no timeout)
+        :param rate_limiter: optional, RateLimiter that schedules all REST calls by priority lanes, defaults to None (no limit)
+        :param cache: optional, ResponseCache of public calls or True to cache reference data by reference_ttls,
+        defaults to False (no caching)
+        :param json_loads: optional, function decoding REST responses and STOMP bodies, defaults to orjson.loads
+        if orjson is installed, json.loads otherwise
+        :param raw: defaults to False, if True REST methods return undecoded response bytes (the client still decodes
+        responses it reads itself, for example pages of iter* methods or the server time of syncClock)
+        :param instrumentation: optional, Instrumentation or True to record latency of request phases per endpoint,
+        defaults to False (nothing is recorded)
+        :param compression: defaults to True (responses are requested gzip, deflate or brotli compressed if brotli
+        is installed), if False responses are requested uncompressed
+        """
         self.apiKey = apiKey
         self.apiSecret = apiSecret
+        self.signer = Signer(apiSecret) if apiSecret else None
         self.baseAPI = baseAPI
         self.baseWS = baseWS
         self.topics = topics
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.cache = ResponseCache(self.reference_ttls) if cache is True else cache or None
+        self.json_loads = json_loads or loads
+        self.raw = raw
+        self.instrumentation = Instrumentation() if instrumentation is True else instrumentation or None
+        self.compression = compression
+        self.transfer = TransferMetrics()
+        self.clock = ServerClock()
+        self._clockSync = None
+        self._session = None
+        self.stomp = None
+        self.routes = dict()  # stream: (handler, decoder) added by stream* methods
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Closes all pooled connections of the client"""
+
+        self.stopClockSync()
+        if self._session is not None:
+            self._session.close()
+
+    def getMetrics(self) -> dict:
+        """Returns transfer byte counts and metrics of the rate limiter, cache, instrumentation and streams in use"""
+
+        metrics = {'transfer': self.transfer.getMetrics()}
+        if self.rate_limiter is not None:
+            metrics['rate_limiter'] = self.rate_limiter.getMetrics()
+        if self.cache is not None:
+            metrics['cache'] = self.cache.getMetrics()
+        if self.instrumentation is not None:
+            metrics['latency'] = self.instrumentation.snapshot()
+        if self.stomp is not None:
+            metrics['stream'] = self.stomp.getMetrics()
+        return metrics
+
+    # CLOCK
+
+    def now_ms(self) -> int:
+        """Returns current server time in milliseconds, estimated by the local clock and the offset found by syncClock"""
+
+        return self.clock.now()
+
+    def syncClock(self, samples: int = 5) -> dict:
+        """Measures offset of the server clock by getServerTime requests
+
+        :param samples: number of requests, the one with the minimum round trip time is trusted the most
+
+        :returns: dict - offset and round trip time of the best sample in milliseconds
+
+        .. code block:: python
+
+            {
+                'offset': -231.5,   # Server clock is behind the local one
+                'rtt': 38.2
+            }
+
+        """
+
+        for _ in range(samples):
+            sent = time() * 1000
+            response = self._decode(self.getServerTime())
+            self.clock.addSample(sent, response['serverTime'], time() * 1000)
+
+        return {'offset': self.clock.offset, 'rtt': self.clock.rtt}
+
+    def startClockSync(self, interval: float = 60, samples: int = 5):
+        """Starts syncing the clock in a background thread every interval seconds"""
+
+        stop = threading.Event()
+
+        def loop():
+            while not stop.is_set():
+                try:
+                    self.syncClock(samples = samples)
+                except Exception:
+                    pass
+                stop.wait(interval)
+
+        self.stopClockSync()
+        self._clockSync = stop
+        threading.Thread(target = loop, daemon = True).start()
+
+    def stopClockSync(self):
+        if self._clockSync is not None:
+            self._clockSync.set()
+            self._clockSync = None
+
+    # TRANSPORT
+
+    @property
+    def session(self):
+        """Pooled session, it is created on the first request"""
+
+        if self._session is None:
+            self._session = self._createSession()
+        return self._session
+
+    @session.setter
+    def session(self, session):
+        self._session = session
+
+    def _createSession(self) -> 'requests.Session':
+        """Creating a session that keeps connections to the exchange alive between requests"""
+
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections = self.pool_connections, pool_maxsize = self.pool_maxsize)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+        if self.instrumentation is not None:
+            adapter.poolmanager.pool_classes_by_scheme = timedPoolClasses()
+
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+
+        session.headers['Accept-Encoding'] = ACCEPT_ENCODING if self.compression else 'identity'
+
+        return session
+
+    def _APIrequest(self, url: str, request_type: Optional[str] = 'get', headers: Optional[dict] = None,
+                    json: Optional[dict] = None, lane: Optional[str] = LANE_PUBLIC, phases: Optional[dict] = None):
+        """Sending a request through the pooled session, all REST calls end up here"""
+
+        if self.instrumentation is not None:
+            return self._APIrequestTimed(url, request_type, headers, json, lane, phases or dict())
+
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(lane)
+
+        if request_type == 'get':
+            response = self.session.get(url, headers = headers, timeout = self.timeout)
+
+        elif request_type == 'post':
+            response = self.session.post(url, headers = headers, json = json, timeout = self.timeout)
+
+        self._recordTransfer(response)
+
+        if self.raw:
+            return response.content
+
+        return self.json_loads(response.content)
+
+    def _recordTransfer(self, response: 'requests.Response'):
+        """Counting bytes received over the wire, which are compressed if the server applied a content encoding"""
+
+        self.transfer.record(response.headers.get('Content-Encoding'), response.raw.tell(), len(response.content))
+
+    def _APIrequestTimed(self, url: str, request_type: str, headers: Optional[dict], json: Optional[dict], lane: str,
+                         phases: dict):
+        """Same as _APIrequest, but each phase is timed and recorded by the instrumentation"""
+
+        started = perf_counter()
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(lane)
+            phases['queue'] = (perf_counter() - started) * 1000
+
+        # Response headers are received first, so that the body download is timed separately
+        sent = perf_counter()
+        connectionPhases.phases = phases
+        try:
+            if request_type == 'get':
+                response = self.session.get(url, headers = headers, timeout = self.timeout, stream = True)
+
+            elif request_type == 'post':
+                response = self.session.post(url, headers = headers, json = json, timeout = self.timeout, stream = True)
+        finally:
+            connectionPhases.phases = None
+
+        received = perf_counter()
+        content = response.content
+        downloaded = perf_counter()
+        self._recordTransfer(response)
+        decoded = content if self.raw else self.json_loads(content)
+        finished = perf_counter()
+
+        splitConnectPhases(phases)
+        phases['ttfb'] = (received - sent) * 1000 - phases.get('connect', 0.0) - phases.get('tls', 0.0)
+        phases['download'] = (downloaded - received) * 1000
+        if not self.raw:
+            phases['decode'] = (finished - downloaded) * 1000
+        phases['total'] = (finished - started) * 1000 + phases.get('sign', 0.0)
+
+        self.instrumentation.record(self._callTemplate(url), phases)
+        return decoded
+
+    @classmethod
+    def _callPatterns(cls) -> list:
+        """Compiling *_call templates into patterns, the ones with more fixed characters are matched first"""
+
+        if '_call_patterns' not in cls.__dict__:
+            templates = [value.split('?')[0] for name, value in vars(LatokenClient).items() if name.endswith('_call')]
+            templates.sort(key = lambda template: -len(re.sub(r'\{[^}]*\}', '', template)))
+            cls._call_patterns = [
+                (re.compile('[^/]+'.join(re.escape(part) for part in re.split(r'\{[^}]*\}', template))), template)
+                for template in templates
+            ]
+        return cls._call_patterns
+
+    def _callTemplate(self, url: str) -> str:
+        """Returns the *_call template of a request url, or its path if no template matches"""
+
+        path = url[len(self.baseAPI):].split('?')[0]
+        for pattern, template in self._callPatterns():
+            if pattern.fullmatch(path):
+                return template
+        return path
+
+    def _postprocess(self, response, function):
+        """Applying a function to the decoded response, asyncio client applies it once the response is awaited"""
+
+        return function(response)
+
+    def _decode(self, response):
+        """Responses read by the client itself are decoded even if REST methods return raw bytes"""
+
+        return self.json_loads(response) if isinstance(response, (bytes, bytearray)) else response
+
+    def _APIpublic(self, endpoint: str):
+        """Sending public calls, endpoint may already contain query params"""
+
+        if self.cache is not None and endpoint in self.cache:
+            return self.cache.get(endpoint, lambda: self._APIrequest(self.baseAPI + endpoint))
+
+        return self._APIrequest(self.baseAPI + endpoint)
 
     # CONTROLLERS
 
@@ -143,52 +432,46 @@ class LatokenClient:
     def _APIsigned(self, endpoint: str, params: dict = None, request_type: Optional[str] = 'get'):
         """Signing get and post private calls by api key and secret by HMAC-SHA512"""
 
-        if params:
-            serializeFunc = map(lambda it: it[0] + '=' + str(it[1]), params.items())
-            queryParams = '&'.join(serializeFunc)
-        else:
-            queryParams = ''
+        queryParams = serialize(params) if params else ''
 
-        if request_type == 'get':
-            signature = hmac.new(
-                self.apiSecret,
-                ('GET' + endpoint + queryParams).encode('ascii'),
-                hashlib.sha512
-            )
+        started = perf_counter()
+        signature = self.signer.sign(request_type.upper() + endpoint + queryParams)
+        phases = {'sign': (perf_counter() - started) * 1000}
 
+        if request_type == 'get':
             url = self.baseAPI + endpoint + '?' + queryParams
 
-            response = requests.get(
+            return self._APIrequest(
                 url,
                 headers = {
                     'X-LA-APIKEY': self.apiKey,
-                    'X-LA-SIGNATURE': signature.hexdigest(),
+                    'X-LA-SIGNATURE': signature,
                     'X-LA-DIGEST': 'HMAC-SHA512'
-                    }
+                    },
+                lane = LANE_PRIVATE,
+                phases = phases
             )
 
         elif request_type == 'post':
-            signature = hmac.new(
-                self.apiSecret,
-                ('POST' + endpoint + queryParams).encode('ascii'),
-                hashlib.sha512
-            )
-
             url = self.baseAPI + endpoint
 
-            response = requests.post(
+            # All cancellation calls start with the cancel by id path and pre-empt any other queued request
+            lane = LANE_CANCEL if endpoint.startswith(self.order_cancel_id_call) else LANE_TRADING
+
+            return self._APIrequest(
                 url,
+                request_type = 'post',
                 headers = {
                     'Content-Type': 'application/json',
                     'X-LA-APIKEY': self.apiKey,
-                    'X-LA-SIGNATURE': signature.hexdigest(),
+                    'X-LA-SIGNATURE': signature,
                     'X-LA-DIGEST': 'HMAC-SHA512'
                     },
-                json = params
+                json = params,
+                lane = lane,
+                phases = phases
             )
 
-        return response.json()
-
     # EXCHANGE ENDPOINTS
 
     def getUserInfo(self) -> dict:
@@ -228,7 +511,7 @@ class LatokenClient:
 
         """
 
-        return requests.get(self.baseAPI + self.time_call).json()
+        return self._APIpublic(endpoint = self.time_call)
 
 
     def getAccountBalances(self,  currency: Optional[str] = None, account_type: Optional[str] = None,
@@ -340,7 +623,7 @@ class LatokenClient:
 
 
     def placeOrder(self, pair: str, side: str, client_message: str, price: float, quantity: float,
-                   timestamp: int, condition: str = 'GOOD_TILL_CANCELLED', order_type: str = 'LIMIT') -> dict:
+                   timestamp: Optional[int] = None, condition: str = 'GOOD_TILL_CANCELLED', order_type: str = 'LIMIT') -> dict:
         """Places an order
 
         :param pair: max 20 characters, can be any combination of currency id or currency tag (format ***/***)
@@ -350,7 +633,7 @@ class LatokenClient:
         :type price: string (method argument accepts float for user convenience)
         :param quantity: max 50 characters
         :type quantity: string (method argument accepts float for user convenience)
-        :param timestamp: required for correct signature
+        :param timestamp: required for correct signature, defaults to the server time estimated by now_ms
         :param condition: max 30 characters, can be "GTC", "GOOD_TILL_CANCELLED" (default),
         "IOC", "IMMEDIATE_OR_CANCEL", "FOK", "FILL_OR_KILL"
         :param order_type: max 30 characters, can be "LIMIT" (default), "MARKET"
@@ -375,7 +658,7 @@ class LatokenClient:
                         'clientOrderId': str(client_message),
                         'price': str(price),
                         'quantity': str(quantity),
-                        'timestamp': int(timestamp)
+                        'timestamp': int(timestamp) if timestamp is not None else self.now_ms()
                       })
         return self._APIsigned(endpoint = self.order_place_call, params = requestBodyParams, request_type = 'post')
 
@@ -465,11 +748,10 @@ class LatokenClient:
             return self._APIsigned(endpoint = self.trades_user_call, params = queryParams)
 
         elif pair:  # PUBLIC
-            serializeFunc = map(lambda it: it[0] + '=' + str(it[1]), queryParams.items())
-            queryParams = '&'.join(serializeFunc)
+            queryParams = serialize(queryParams)
 
             pathParams = self._inputController(pair = pair)
-            return requests.get(self.baseAPI + self.trades_all_call.format(**pathParams) + '?' + queryParams).json()
+            return self._APIpublic(endpoint = self.trades_all_call.format(**pathParams) + '?' + queryParams)
 
 
     def transferSpot(self, amount: float, currency_id: str, deposit: bool = True) -> dict:
@@ -774,7 +1056,7 @@ class LatokenClient:
 
         """
 
-        return requests.get(self.baseAPI + self.bindings_active_call).json()
+        return self._APIpublic(endpoint = self.bindings_active_call)
 
 
     def getActiveCurrencyBindings(self) -> dict:
@@ -980,10 +1262,10 @@ class LatokenClient:
 
         if currency:
             pathParams = self._inputController(currency = currency)
-            return requests.get(self.baseAPI + self.currency_call.format(**pathParams)).json()
+            return self._APIpublic(endpoint = self.currency_call.format(**pathParams))
 
         elif get_all:
-            return requests.get(self.baseAPI + self.active_currency_call).json()
+            return self._APIpublic(endpoint = self.active_currency_call)
 
 
     def getQuoteCurrencies(self) -> list:
@@ -1004,7 +1286,7 @@ class LatokenClient:
 
         """
 
-        return requests.get(self.baseAPI + self.quote_currency_call).json()
+        return self._APIpublic(endpoint = self.quote_currency_call)
 
 
     def getActivePairs(self) -> list:
@@ -1035,7 +1317,7 @@ class LatokenClient:
 
         """
 
-        return requests.get(self.baseAPI + self.active_pairs_call).json()
+        return self._APIpublic(endpoint = self.active_pairs_call)
 
 
     def getOrderbook(self, pair: str, limit: Optional[int] = 1000) -> dict:
@@ -1071,7 +1353,7 @@ class LatokenClient:
 
         pathParams = self._inputController(pair = pair)
         queryParams = f'limit={limit}'
-        return requests.get(self.baseAPI + self.orderbook_call.format(**pathParams) + '?' + queryParams).json()
+        return self._APIpublic(endpoint = self.orderbook_call.format(**pathParams) + '?' + queryParams)
 
 
     def getTickers(self, pair: Optional[str] = None, get_all: bool = True):
@@ -1102,10 +1384,10 @@ class LatokenClient:
 
         if pair:
             pathParams = self._inputController(pair = pair)
-            return requests.get(self.baseAPI + self.tickers_per_pair_call.format(**pathParams)).json()
+            return self._APIpublic(endpoint = self.tickers_per_pair_call.format(**pathParams))
 
         elif get_all:
-            return requests.get(self.baseAPI + self.tickers_call).json()
+            return self._APIpublic(endpoint = self.tickers_call)
 
 
     def getFeeLevels(self) -> list:
@@ -1129,7 +1411,7 @@ class LatokenClient:
 
         """
 
-        return requests.get(self.baseAPI + self.fee_levels_call).json()
+        return self._APIpublic(endpoint = self.fee_levels_call)
 
 
     def getFeeScheme(self, pair: str, user: Optional[bool] = False) -> dict:
@@ -1154,7 +1436,7 @@ class LatokenClient:
             return self._APIsigned(endpoint = self.fee_scheme_par_pair_and_user_call.format(**pathParams))
 
         elif pair:
-            return requests.get(self.baseAPI + self.fee_scheme_per_pair_call.format(**pathParams)).json()
+            return self._APIpublic(endpoint = self.fee_scheme_per_pair_call.format(**pathParams))
 
 
     def getChart(self, pair: Optional[str] = None):
@@ -1177,19 +1459,21 @@ class LatokenClient:
 
         if pair:
             pathParams = self._inputController(pair = pair)
-            return requests.get(self.baseAPI + self.weekly_chart_by_pair_call.format(**pathParams)).json()
+            return self._APIpublic(endpoint = self.weekly_chart_by_pair_call.format(**pathParams))
 
         else:
-            return requests.get(self.baseAPI + self.weekly_chart_call).json()
+            return self._APIpublic(endpoint = self.weekly_chart_call)
 
 
-    def getCandles(self, start: str, end: str, pair: str = None, resolution: str = '1h') -> dict:
+    def getCandles(self, start: str, end: str, pair: str = None, resolution: str = '1h', as_arrays: bool = False) -> dict:
         """Returns charts
 
         :param pair: can be either currency tag or currency id (should of format ***/***)
         :param resolution: can be 1m, 1h (default), 4h, 6h, 12h, 1d, 7d or 1w, 30d or 1M
         :param start: timestamp in seconds (included in responce)
         :param end: timestamp in seconds (not included in responce)
+        :param as_arrays: defaults to False, if True the same keys are returned as NumPy float64 arrays
+        ("t" as int64 array, "s" is validated and dropped), requires numpy
 
         :returns: dict - the dict with open, close, low, high, time, volume as keys and list of values
 
@@ -1213,66 +1497,421 @@ class LatokenClient:
             'from': str(start),
             'to': str(end)
             })
-        return requests.get(self.baseAPI + self.candles_call.format(**pathParams)).json()
+        candles = self._APIpublic(endpoint = self.candles_call.format(**pathParams))
+
+        if as_arrays:
+            return self._postprocess(candles, lambda candles: candlesToArrays(self._decode(candles)))
+
+        return candles
+
+
+    def getCandlesHistory(self, start: int, end: int, pair: str, resolution: str = '1h', max_workers: Optional[int] = None,
+                          cache_path: Optional[str] = None) -> dict:
+        """Returns candles of a long range, fetched concurrently by windows of CANDLES_PER_REQUEST candles
+
+        Windows are aligned to fixed boundaries, so with cache_path only the windows that are not cached yet
+        (and the ones that are not finished) are requested. Requires numpy.
+
+        :param start: timestamp in seconds (included in responce)
+        :param end: timestamp in seconds (not included in responce)
+        :param pair: can be either currency tag or currency id (should of format ***/***)
+        :param resolution: can be 1m, 1h (default), 4h, 6h, 12h, 1d, 7d or 1w, 30d or 1M
+        :param max_workers: optional, number of requests in flight, defaults to the pool size of the client
+        :param cache_path: optional, directory of the on-disk cache of windows, defaults to None (no caching)
+
+        :returns: dict - the dict of NumPy arrays as getCandles(as_arrays = True), sorted and de-duplicated by "t"
+
+        """
+
+        pathParams = self._inputController(pair = pair)
+        cache = CandleCache(cache_path) if cache_path else None
+
+        def fetch(window):
+            if cache is not None:
+                candles = cache.load(pathParams, resolution, window)
+                if candles is not None:
+                    return candles
+
+            candles = self.getCandles(window[0], window[1], pair = pair, resolution = resolution, as_arrays = True)
+            if cache is not None:
+                cache.store(pathParams, resolution, window, candles)
+            return candles
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers = max_workers or self.pool_maxsize) as executor:
+            windows = list(executor.map(fetch, candleWindows(start, end, resolution)))
+
+        return mergeCandles(windows, start, end)
+
+
+    # BATCH REQUESTS
+
+    def _pairKey(self, pair: str) -> str:
+        pathParams = self._inputController(pair = pair)
+        return '{currency}/{quote}'.format(**pathParams)
+
+    def _pipeline(self, method, calls: list, max_workers: Optional[int] = None) -> list:
+        """Calling a method with each dict of keyword arguments concurrently by a bounded pool of threads
+
+        Results are returned in the order of calls, an exception raised by a call is returned as its result
+        """
+
+        def call(kwargs):
+            try:
+                return method(**kwargs)
+            except Exception as error:
+                return error
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers = max_workers or self.pool_maxsize) as executor:
+            return list(executor.map(call, calls))
+
+    def _batch(self, method, pairs: list, max_workers: Optional[int] = None, **kwargs) -> dict:
+        """Calling a per-pair method for each pair concurrently, results are keyed by pairs as they were given
+
+        Pairs are normalised inside each call, so a malformed pair is returned as its own exception
+        instead of failing the whole batch
+        """
+
+        def call(pair: str, **kwargs):
+            return method(pair = self._pairKey(pair), **kwargs)
+
+        pairs = list(dict.fromkeys(pairs))
+        results = self._pipeline(call, [dict(kwargs, pair = pair) for pair in pairs], max_workers = max_workers)
+        return self._postprocess(results, lambda results: dict(zip(pairs, results)))
+
+
+    def getOrderbooks(self, pairs: list, limit: Optional[int] = 1000, max_workers: Optional[int] = None) -> dict:
+        """Returns orderbooks for several pairs fetched concurrently
+
+        :param pairs: list of pairs, can be either currency tag or currency id (should of format ***/***)
+        :param limit: number or price levels returned in bids and asks, defaults to 1000
+        :param max_workers: optional, number of requests in flight, defaults to the pool size of the client
+
+        :returns: dict - dict with pairs as keys and getOrderbook results (or raised exceptions) as values
+
+        .. code block:: python
+
+            {
+                'BTC/USDT': {'ask': [...], 'bid': [...], 'totalAsk': '3.4354', 'totalBid': '204967.154792'},
+                'ETH/USDT': ConnectionError(...),
+                ...
+            }
+
+        """
+
+        return self._batch(self.getOrderbook, pairs, max_workers = max_workers, limit = limit)
+
+
+    def getTickersFor(self, pairs: list, max_workers: Optional[int] = None) -> dict:
+        """Returns tickers for several pairs fetched concurrently
+
+        :param pairs: list of pairs, can be either currency tag or currency id (should of format ***/***)
+        :param max_workers: optional, number of requests in flight, defaults to the pool size of the client
+
+        :returns: dict - dict with pairs as keys and getTickers results (or raised exceptions) as values
+
+        """
+
+        return self._batch(self.getTickers, pairs, max_workers = max_workers, get_all = False)
+
+
+    def getFeeSchemes(self, pairs: list, user: Optional[bool] = False, max_workers: Optional[int] = None) -> dict:
+        """Returns fee schemes for several pairs fetched concurrently
+
+        :param pairs: list of pairs, can be either currency tag or currency id (should of format ***/***)
+        :param user: defaults to False (returns fee schemes per pair for all users, for particular user otherwise)
+        :param max_workers: optional, number of requests in flight, defaults to the pool size of the client
+
+        :returns: dict - dict with pairs as keys and getFeeScheme results (or raised exceptions) as values
+
+        """
+
+        return self._batch(self.getFeeScheme, pairs, max_workers = max_workers, user = user)
+
+
+    def placeOrders(self, orders: list, max_workers: Optional[int] = None) -> dict:
+        """Places several orders, requests are signed and sent concurrently over the pooled connections
+
+        :param orders: list of dicts with placeOrder arguments
+        :param max_workers: optional, number of requests in flight, defaults to the pool size of the client
+
+        :returns: dict - placeOrder responces (or raised exceptions) in the order of orders and seconds it took
+
+        .. code block:: python
+
+            {
+                'results': [
+                    {'message': 'order accepted for placing', 'status': 'SUCCESS', 'id': 'a44444aa-4444-44a4-444a-44444a444aaa'},
+                    ...
+                ],
+                'elapsed': 0.084
+            }
+
+        """
+
+        started = perf_counter()
+        results = self._pipeline(self.placeOrder, orders, max_workers = max_workers)
+        return self._postprocess(results, lambda results: {'results': results, 'elapsed': perf_counter() - started})
+
+
+    def cancelOrders(self, order_ids: list, max_workers: Optional[int] = None) -> dict:
+        """Cancels several orders by id, requests are signed and sent concurrently over the pooled connections
+
+        :param order_ids: list of order ids
+        :param max_workers: optional, number of requests in flight, defaults to the pool size of the client
+
+        :returns: dict - cancelOrder responces (or raised exceptions) in the order of order_ids and seconds it took
+
+        """
+
+        started = perf_counter()
+        results = self._pipeline(self.cancelOrder, [{'order_id': order_id} for order_id in order_ids],
+                                 max_workers = max_workers)
+        return self._postprocess(results, lambda results: {'results': results, 'elapsed': perf_counter() - started})
+
+
+    # PAGINATION
+
+    # Maximum page size accepted by paginated endpoints
+    max_page_size = 1000
+
+    def _paginate(self, method, size: int, prefetch: int):
+        """Yielding records of all pages, while the next pages are requested in the background
+
+        At most prefetch + 1 pages are held at once, regardless the length of history
+        """
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers = prefetch + 1) as executor:
+            pending = deque(executor.submit(method, page = page, size = size) for page in range(prefetch + 1))
+            next_page = prefetch + 1
+            try:
+                while pending:
+                    response = self._decode(pending.popleft().result())
+
+                    if response.get('hasNext'):
+                        pending.append(executor.submit(method, page = next_page, size = size))
+                        next_page += 1
+
+                    yield from response['content']
+
+                    if not response.get('hasNext'):
+                        break
+            finally:
+                for future in pending:
+                    future.cancel()
+
+
+    def iterTransfers(self, size: Optional[int] = max_page_size, prefetch: Optional[int] = 1):
+        """Yields all user transfers (from the most recent to the least recent) page by page
+
+        :param size: should be 1-1000 (defaults to 1000), number of results requested per page
+        :param prefetch: number of pages requested ahead while the current one is processed, defaults to 1
+
+        :returns: generator - generator of transfer dicts as in getTransfers content (async generator for asyncio client)
+
+        """
+
+        return self._paginate(self.getTransfers, size, prefetch)
+
+
+    def iterTransactions(self, size: Optional[int] = max_page_size, prefetch: Optional[int] = 1):
+        """Yields all user transactions page by page
+
+        :param size: should be 1-1000 (defaults to 1000), number of results requested per page
+        :param prefetch: number of pages requested ahead while the current one is processed, defaults to 1
+
+        :returns: generator - generator of transaction dicts as in getTransactions content (async generator for asyncio client)
+
+        """
+
+        return self._paginate(self.getTransactions, size, prefetch)
+
+
+    # HISTORY
+
+    def _walkHistory(self, method, since: Optional[int], until: Optional[int], limit: int, **kwargs):
+        cursor = HistoryCursor(since = since, until = until, limit = limit)
+        while not cursor.done:
+            yield from cursor.advance(self._decode(method(timestamp = cursor.timestamp, limit = limit, **kwargs)))
+
+    def _collect(self, records) -> list:
+        return list(records)
+
+
+    def iterTrades(self, pair: Optional[str] = None, user: bool = False, since: Optional[int] = None,
+                   until: Optional[int] = None, limit: Optional[int] = 100):
+        """Yields trades history from the most recent to the least recent, walking pages of getTrades by timestamp
+
+        :param pair: required for market trades and user trades in a specific pair (should be of format ***/***)
+        :param user: defaults to False (market trades), if True user trades are returned
+        :param since: optional, timestamp in milliseconds, older trades are not returned (defaults to the whole history)
+        :param until: optional, timestamp in milliseconds, defaults to current
+        :param limit: optional, number of trades requested per page, defaults to 100
+
+        :returns: generator - generator of trade dicts as in getTrades, each trade is returned once
+        (async generator for asyncio client)
+
+        """
+
+        return self._walkHistory(self.getTrades, since, until, limit, pair = pair, user = user)
+
+
+    def iterOrders(self, pair: Optional[str] = None, since: Optional[int] = None, until: Optional[int] = None,
+                   limit: Optional[int] = 100):
+        """Yields user orders history from the most recent to the least recent, walking pages of getOrders by timestamp
+
+        :param pair: optional, orders in a specific pair (should be of format ***/***), defaults to all pairs
+        :param since: optional, timestamp in milliseconds, older orders are not returned (defaults to the whole history)
+        :param until: optional, timestamp in milliseconds, defaults to current
+        :param limit: optional, number of orders requested per page, defaults to 100
+
+        :returns: generator - generator of order dicts as in getOrders, each order is returned once
+        (async generator for asyncio client)
+
+        """
+
+        return self._walkHistory(self.getOrders, since, until, limit, pair = pair)
+
+
+    def _tradesHistory(self, pair: str, **kwargs):
+        return self._collect(self.iterTrades(pair = pair, **kwargs))
+
+    def _ordersHistory(self, pair: str, **kwargs):
+        return self._collect(self.iterOrders(pair = pair, **kwargs))
+
+
+    def getTradesHistory(self, pairs: list, user: bool = False, since: Optional[int] = None, until: Optional[int] = None,
+                         limit: Optional[int] = 100, max_workers: Optional[int] = None) -> dict:
+        """Returns trades history of several pairs, pairs are walked concurrently as in iterTrades
+
+        :returns: dict - dict with pairs as keys and lists of trades (or raised exceptions) as values
+        """
+
+        return self._batch(self._tradesHistory, pairs, max_workers = max_workers, user = user, since = since,
+                           until = until, limit = limit)
+
+
+    def getOrdersHistory(self, pairs: list, since: Optional[int] = None, until: Optional[int] = None,
+                         limit: Optional[int] = 100, max_workers: Optional[int] = None) -> dict:
+        """Returns user orders history of several pairs, pairs are walked concurrently as in iterOrders
+
+        :returns: dict - dict with pairs as keys and lists of orders (or raised exceptions) as values
+        """
+
+        return self._batch(self._ordersHistory, pairs, max_workers = max_workers, since = since,
+                           until = until, limit = limit)
 
 
     # WEBSOCKETS
 
     def _WSsigned(self) -> dict:
-        timestamp = str(int(float(time()) * 1000))
+        timestamp = str(self.now_ms())
 
         # We should sign a timestamp in milliseconds by the api secret
-        signature = hmac.new(
-            self.apiSecret,
-            timestamp.encode('ascii'),
-            hashlib.sha512
-        )
+        signature = self.signer.sign(timestamp)
         return {
                 'X-LA-APIKEY': self.apiKey,
-                'X-LA-SIGNATURE': signature.hexdigest(),
+                'X-LA-SIGNATURE': signature,
                 'X-LA-DIGEST': 'HMAC-SHA512',
                 'X-LA-SIGDATA': timestamp
                 }
 
 
-    async def connect(self, streams: list = topics, signed: bool = False, on_message = None):
+    async def connect(self, streams: list = topics, signed: bool = False, on_message = None, decode: bool = False,
+                      heartbeat: tuple = (10000, 10000), reconnect: bool = True, connections: int = 1,
+                      balance: str = 'count', **options):
+        """Connects to STOMP websockets, subscribes to streams and awaits on_message with each message
 
-            ws=websocket.create_connection(self.baseWS)
-            msg = stomper.Frame()
-            msg.cmd = "CONNECT"
-            msg.headers = {
-                            "accept-version": "1.1", 
-                            "heart-beat": "0,0"
-                            }
-            
-            # If the request is for a private stream, then add signature headers to headers
-            if signed:
-                msg.headers.update(self._WSsigned())
+        The connection runs on the event loop (see StompConnection), so other coroutines keep running between messages.
+        Lost connections are reopened, signed again and subscribed to the same streams.
+        Metrics of the connection are available by getMetrics once it is started.
+
+        Messages of streams added with a handler or a decoder by stream* methods are routed by their subscription id
+        (see StreamRouter), messages of other streams are passed to on_message.
+
+        .. code block:: python
+
+            latoken.streamBook(pairs = ['BTC/USDT'], handler = onBook, decoder = True)
+            latoken.streamTrades(pairs = ['BTC/USDT', 'ETH/USDT'], handler = onTrades)
+            latoken.run(latoken.connect(on_message = consumer))
+
+        :param streams: defaults to topics added by stream* methods
+        :param signed: defaults to False, should be True for private streams
+        :param on_message: async function called with each message as a dict of cmd, headers and body,
+        except messages of streams with a handler
+        :param decode: defaults to False (body is a json string), if True body is decoded by the client decoder
+        :param heartbeat: milliseconds between heart-beats (client sends, client expects), defaults to (10000, 10000)
+        :param reconnect: defaults to True, if False a lost connection raises ConnectionError
+        :param connections: defaults to 1, if more streams are sharded across this many connections (see StompPool)
+        :param balance: 'count' or 'rate', how streams are sharded across connections, defaults to 'count'
+        :param options: other StompConnection or StompPool arguments, for example stale_timeout or rebalance_interval
+        """
+
+        from latoken.stomp import StompConnection, StompPool, StreamRouter
 
-            ws.send(msg.pack())
-            ws.recv()
+        # Subscription id is assigned as an index in streams list
+        routes = [(str(index), self.routes[stream]) for index, stream in enumerate(streams) if stream in self.routes]
+        if routes:
+            on_message = StreamRouter(on_message, json_loads = self.json_loads)
+            for subscription_id, (handler, decoder) in routes:
+                on_message.add(subscription_id, handler, decoder)
 
-            # Subscribing to streams, subscription id is assigned as an index in topics list
-            for stream in streams:
-                msg = stomper.subscribe(stream, streams.index(stream), ack="auto")
-                ws.send(msg)
+        if connections > 1:
+            options.update(connections = connections, balance = balance)
+        connection = self.stomp = (StompPool if connections > 1 else StompConnection)(
+            self.baseWS, on_message,
+            # If the request is for a private stream, then add signature headers to headers
+            connect_headers = self._WSsigned if signed else None,
+            json_loads = self.json_loads if decode else None,
+            heartbeat = heartbeat,
+            reconnect = reconnect,
+            **options
+        )
 
-            # Telling the application to execute a business logic on each message from the server
-            while True:
-                message = ws.recv()
-                message = stomper.unpack_frame(message.decode())
-                await on_message(message)
+        for index, stream in enumerate(streams):
+            await connection.subscribe(stream, index)
+
+        await connection.run()
 
 
     def run(self, connect):
+        import asyncio
+
         loop = asyncio.get_event_loop()
         loop.run_until_complete(connect)
 
 
     # Websocket streams
-    def streamAccounts(self) -> dict:
+    def _addStream(self, stream: str, handler: Optional[Callable] = None, decoder: Union[bool, Callable, None] = None,
+                   **pathParams):
+        """Adds the stream to topics and its handler and decoder to routes, which connect subscribes with"""
+
+        destination = stream.format(**pathParams)
+        if decoder is True:
+            if stream not in self.stream_decoders:
+                raise ValueError(f'There is no typed decoder of {stream}, decoder should be a function')
+            decoder = self.stream_decoders[stream]
+        if handler is not None or decoder:
+            self.routes[destination] = (handler, decoder or None)
+        return self.topics.append(destination)
+
+    def _userStream(self, stream: str, handler: Optional[Callable] = None, decoder: Union[bool, Callable, None] = None):
+        """Private streams are addressed by the id of the authenticated user"""
+
+        user_id = self._decode(self.getUserInfo())['id']
+        return self._addStream(stream, handler, decoder, user = str(user_id))
+
+    def streamAccounts(self, handler: Optional[Callable] = None, decoder: Union[bool, Callable, None] = None) -> dict:
         """Returns all user currency balances
 
+        :param handler: optional, async function called with messages of this stream instead of on_message of connect
+        :param decoder: optional, True for Balance records as payload, or a function of the decoded body
+
         :returns: dict - dict with all user balances by wallet type
 
         .. code block:: python
@@ -1306,15 +1945,15 @@ class LatokenClient:
 
         """
 
-        user_id = self.getUserInfo()['id']
-        pathParams = {'user': str(user_id)}
-        accounts_topics = self.account_stream.format(**pathParams)
-        return self.topics.append(accounts_topics)
+        return self._userStream(self.account_stream, handler, decoder)
 
 
-    def streamTransactions(self):
+    def streamTransactions(self, handler: Optional[Callable] = None, decoder: Union[bool, Callable, None] = None):
         """Stream returns user transactions (to/from outside LATOKEN) history, function only returns a subscription endpoint
 
+        :param handler: optional, async function called with messages of this stream instead of on_message of connect
+        :param decoder: optional, function of the decoded body, which replaces the body
+
         .. code block:: python
 
         {
@@ -1352,29 +1991,29 @@ class LatokenClient:
 
         """
 
-        user_id = self.getUserInfo()['id']
-        pathParams = {'user': str(user_id)}
-        transactions_topics = self.transactions_stream.format(**pathParams)
-        return self.topics.append(transactions_topics)
+        return self._userStream(self.transactions_stream, handler, decoder)
 
 
-    def streamTransfers(self):
+    def streamTransfers(self, handler: Optional[Callable] = None, decoder: Union[bool, Callable, None] = None):
         """Stream returns user transfers (within LATOKEN) history, function only returns a subscription endpoint
 
+        :param handler: optional, async function called with messages of this stream instead of on_message of connect
+        :param decoder: optional, function of the decoded body, which replaces the body
+
         .. code block:: python
 
 
         """
 
-        user_id = self.getUserInfo()['id']
-        pathParams = {'user': str(user_id)}
-        transfers_topics = self.transfers_stream.format(**pathParams)
-        return self.topics.append(transfers_topics)
+        return self._userStream(self.transfers_stream, handler, decoder)
 
 
-    def streamOrders(self):
+    def streamOrders(self, handler: Optional[Callable] = None, decoder: Union[bool, Callable, None] = None):
         """Stream returns user orders history, function only returns a subscription endpoint
 
+        :param handler: optional, async function called with messages of this stream instead of on_message of connect
+        :param decoder: optional, True for Order records as payload, or a function of the decoded body
+
         .. code block:: python
 
         {
@@ -1416,15 +2055,15 @@ class LatokenClient:
 
         """
 
-        user_id = self.getUserInfo()['id']
-        pathParams = {'user': str(user_id)}
-        orders_topics = self.orders_stream.format(**pathParams)
-        return self.topics.append(orders_topics)
+        return self._userStream(self.orders_stream, handler, decoder)
 
 
-    def streamCurrencies(self):
+    def streamCurrencies(self, handler: Optional[Callable] = None, decoder: Union[bool, Callable, None] = None):
         """Stream returns currencies information, function only returns a subscription endpoint
 
+        :param handler: optional, async function called with messages of this stream instead of on_message of connect
+        :param decoder: optional, function of the decoded body, which replaces the body
+
         .. code block:: python
 
         {
@@ -1458,12 +2097,15 @@ class LatokenClient:
 
         """
 
-        return self.topics.append(self.currencies_stream)
+        return self._addStream(self.currencies_stream, handler, decoder)
 
 
-    def streamPairs(self):
+    def streamPairs(self, handler: Optional[Callable] = None, decoder: Union[bool, Callable, None] = None):
         """Stream returns pairs information, function only returns a subscription endpoint
 
+        :param handler: optional, async function called with messages of this stream instead of on_message of connect
+        :param decoder: optional, function of the decoded body, which replaces the body
+
         .. code block:: python
 
         {
@@ -1500,12 +2142,15 @@ class LatokenClient:
 
         """
 
-        return self.topics.append(self.pairs_stream)
+        return self._addStream(self.pairs_stream, handler, decoder)
 
 
-    def streamTickers(self):
+    def streamTickers(self, handler: Optional[Callable] = None, decoder: Union[bool, Callable, None] = None):
         """Stream returns tickers for all pairs, function only returns a subscription endpoint
 
+        :param handler: optional, async function called with messages of this stream instead of on_message of connect
+        :param decoder: optional, True for Ticker records as payload, or a function of the decoded body
+
         .. code block:: python
 
         {
@@ -1536,13 +2181,16 @@ class LatokenClient:
 
         """
 
-        return self.topics.append(self.ticker_all_stream)
+        return self._addStream(self.ticker_all_stream, handler, decoder)
 
 
-    def streamBook(self, pairs: list):
+    def streamBook(self, pairs: list, handler: Optional[Callable] = None,
+                   decoder: Union[bool, Callable, None] = None):
         """Stream returns orderbook of a specific pair, function only returns a subscription endpoint
 
         :param pairs: should consist of currency_ids only, otherwise will return nothing, pair should be of format ***/***
+        :param handler: optional, async function called with messages of this stream instead of on_message of connect
+        :param decoder: optional, True for BookLevel records as ask and bid as payload, or a function of the decoded body
 
         :returns: dict - dict for each requested pair as a separate message
 
@@ -1578,14 +2226,16 @@ class LatokenClient:
         """
 
         pathParams = [self._inputController(pair = pair) for pair in pairs]
-        book_topics = [self.book_stream.format(**pathParam) for pathParam in pathParams]
-        return [self.topics.append(book_topic) for book_topic in book_topics]
+        return [self._addStream(self.book_stream, handler, decoder, **pathParam) for pathParam in pathParams]
 
 
-    def streamPairTickers(self, pairs: list):
+    def streamPairTickers(self, pairs: list, handler: Optional[Callable] = None,
+                          decoder: Union[bool, Callable, None] = None):
         """Stream returns pairs' volume and price changes, function only returns a subscription endpoint
 
         :param pairs: should consist of currency_ids only, otherwise will return nothing, pair should be of format ***/***
+        :param handler: optional, async function called with messages of this stream instead of on_message of connect
+        :param decoder: optional, True for a Ticker record as payload, or a function of the decoded body
 
         :returns: dict - dict for each requested pair as a separate message
 
@@ -1617,14 +2267,16 @@ class LatokenClient:
         """
 
         pathParams = [self._inputController(pair = pair) for pair in pairs]
-        pair_tickers_topics = [self.tickers_pair_stream.format(**pathParam) for pathParam in pathParams]
-        return [self.topics.append(pair_tickers_topic) for pair_tickers_topic in pair_tickers_topics]
+        return [self._addStream(self.tickers_pair_stream, handler, decoder, **pathParam) for pathParam in pathParams]
 
 
-    def streamTrades(self, pairs: list):
+    def streamTrades(self, pairs: list, handler: Optional[Callable] = None,
+                     decoder: Union[bool, Callable, None] = None):
         """Stream returns market trades, function only returns a subscription endpoint
 
         :param pairs: should consist of currency_ids only, otherwise will return an empty message, pair should be of format ***/***
+        :param handler: optional, async function called with messages of this stream instead of on_message of connect
+        :param decoder: optional, True for Trade records as payload, or a function of the decoded body
 
         .. code block:: python
 
@@ -1660,14 +2312,16 @@ class LatokenClient:
         """
 
         pathParams = [self._inputController(pair = pair) for pair in pairs]
-        trades_topics = [self.trades_stream.format(**pathParam) for pathParam in pathParams]
-        return [self.topics.append(trades_topic) for trades_topic in trades_topics]
+        return [self._addStream(self.trades_stream, handler, decoder, **pathParam) for pathParam in pathParams]
 
 
-    def streamRates(self, pairs: list):
+    def streamRates(self, pairs: list, handler: Optional[Callable] = None,
+                    decoder: Union[bool, Callable, None] = None):
         """Stream returns rate for specified pairs, function only returns a subscription endpoint
 
         :param pairs: can consist of currency_ids or currency tag, pair should be of format ***/***
+        :param handler: optional, async function called with messages of this stream instead of on_message of connect
+        :param decoder: optional, function of the decoded body, which replaces the body
 
         :returns: dict - dict for each requested pair as a separate message
 
@@ -1696,14 +2350,16 @@ class LatokenClient:
         """
 
         pathParams = [self._inputController(pair = pair) for pair in pairs]
-        rates_topics = [self.rates_stream.format(**pathParam) for pathParam in pathParams]
-        return [self.topics.append(rates_topic) for rates_topic in rates_topics]
+        return [self._addStream(self.rates_stream, handler, decoder, **pathParam) for pathParam in pathParams]
 
 
-    def streamQuoteRates(self, quotes: list):
+    def streamQuoteRates(self, quotes: list, handler: Optional[Callable] = None,
+                         decoder: Union[bool, Callable, None] = None):
         """Stream returns rates for all currencies quoted to specified quotes, function only returns a subscription endpoint
 
         :param quotes: is a list of quote currencies that can be either currency tag or currency id (should of format ***/***)
+        :param handler: optional, async function called with messages of this stream instead of on_message of connect
+        :param decoder: optional, function of the decoded body, which replaces the body
 
         .. code block:: python
 
@@ -1730,8 +2386,7 @@ class LatokenClient:
         """
 
         pathParams = [self._inputController(currency = quote, currency_name = 'quote') for quote in quotes]
-        quote_rates_topics = [self.rates_quote_stream.format(**pathParam) for pathParam in pathParams]
-        return [self.topics.append(quote_rates_topic) for quote_rates_topic in quote_rates_topics]
+        return [self._addStream(self.rates_quote_stream, handler, decoder, **pathParam) for pathParam in pathParams]
 
 
 
@@ -0,0 +1,30 @@
+from collections import deque
+from time import time
+
+
+class ServerClock:
+    """Estimates offset of the server clock from getServerTime samples, NTP-style
+
+    Each sample assumes the server time was taken halfway through the request. The sample with the
+    minimum round trip time has the least uncertainty, so its offset is used.
+
+    :param size: number of the most recent samples the estimate is chosen from
+    """
+
+    __slots__ = ('samples', 'offset', 'rtt')
+
+    def __init__(self, size: int = 16):
+        self.samples = deque(maxlen = size)  # (rtt, offset) in milliseconds
+        self.offset = 0.0
+        self.rtt = None
+
+    def addSample(self, sent: float, server_time: int, received: float):
+        """Adds a sample, sent and received are local times of the request in milliseconds"""
+
+        self.samples.append((received - sent, server_time - (sent + received) / 2))
+        self.rtt, self.offset = min(self.samples)
+
+    def now(self) -> int:
+        """Returns current server time in milliseconds"""
+
+        return int(time() * 1000 + self.offset)
@@ -0,0 +1,58 @@
+import threading
+from importlib.util import find_spec
+
+
+# Content encodings both transports decompress transparently, brotli is only offered when a brotli package is installed
+ENCODINGS = ('gzip', 'deflate') + (('br',) if find_spec('brotli') or find_spec('brotlicffi') else ())
+
+ACCEPT_ENCODING = ', '.join(ENCODINGS)
+
+
+class TransferMetrics:
+    """Counts of response bytes received over the wire and after decompression, per content encoding
+
+    .. code block:: python
+
+        latoken.transfer.getMetrics()
+
+        {
+            'responses': 12,
+            'compressed_bytes': 210417,
+            'uncompressed_bytes': 1873065,
+            'ratio': 8.9,
+            'encodings': {'gzip': {'responses': 10, 'compressed_bytes': 209987, 'uncompressed_bytes': 1872635}, ...}
+        }
+
+    """
+
+    def __init__(self):
+        self.encodings = dict()  # encoding: [responses, compressed bytes, uncompressed bytes]
+        self._lock = threading.Lock()
+
+    def record(self, encoding: str, compressed: int, uncompressed: int):
+        with self._lock:
+            counts = self.encodings.setdefault(encoding or 'identity', [0, 0, 0])
+            counts[0] += 1
+            counts[1] += compressed
+            counts[2] += uncompressed
+
+    def getMetrics(self) -> dict:
+        with self._lock:
+            encodings = {
+                encoding: {'responses': counts[0], 'compressed_bytes': counts[1], 'uncompressed_bytes': counts[2]}
+                for encoding, counts in self.encodings.items()
+            }
+
+        compressed = sum(counts['compressed_bytes'] for counts in encodings.values())
+        uncompressed = sum(counts['uncompressed_bytes'] for counts in encodings.values())
+        return {
+            'responses': sum(counts['responses'] for counts in encodings.values()),
+            'compressed_bytes': compressed,
+            'uncompressed_bytes': uncompressed,
+            'ratio': uncompressed / compressed if compressed else None,
+            'encodings': encodings
+        }
+
+    def reset(self):
+        with self._lock:
+            self.encodings.clear()
@@ -0,0 +1,10 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Decoder used by default for REST responses and STOMP bodies, orjson is used when it is installed
+loads = orjson.loads if orjson is not None else json.loads
@@ -7,6 +7,20 @@ CANDLE_INTERVAL_1D = '1d'
 CANDLE_INTERVAL_7D = '7d'
 CANDLE_INTERVAL_30D = '1M'
 
+# Approximate length of a candle in seconds, used to split long ranges into requests
+CANDLE_INTERVAL_SECONDS = {
+    CANDLE_INTERVAL_1MIN: 60,
+    CANDLE_INTERVAL_1HOUR: 3600,
+    CANDLE_INTERVAL_4HOURS: 4 * 3600,
+    CANDLE_INTERVAL_6HOURS: 6 * 3600,
+    CANDLE_INTERVAL_12HOURS: 12 * 3600,
+    CANDLE_INTERVAL_1D: 86400,
+    CANDLE_INTERVAL_7D: 7 * 86400,
+    '1w': 7 * 86400,
+    CANDLE_INTERVAL_30D: 30 * 86400,
+    '30d': 30 * 86400
+}
+
 SIDE_BUY = 'BUY'
 SIDE_SELL = 'SELL'
 
@@ -14,6 +28,10 @@ ORDER_STATUS_PLACED = 'ORDER_STATUS_PLACED'
 ORDER_STATUS_CLOSED = 'ORDER_STATUS_CLOSED'
 ORDER_STATUS_CANCELLED = 'ORDER_STATUS_CANCELLED'
 
+TRANSFER_STATUS_UNVERIFIED = 'TRANSFER_STATUS_UNVERIFIED'
+TRANSFER_STATUS_PENDING = 'TRANSFER_STATUS_PENDING'
+TRANSFER_STATUS_CONFIRMED = 'TRANSFER_STATUS_CONFIRMED'
+
 ORDER_TYPE_LIMIT = 'LIMIT'
 ORDER_TYPE_MARKET = 'MARKET'
 
@@ -1,5 +1,154 @@
-from latoken.client import LatokenClient
-from typing import Optional
+from typing import TYPE_CHECKING, Callable, Optional
+import json
+
+# The client is imported on first use, so that the index can be loaded from a file without importing it
+if TYPE_CHECKING:
+    from latoken.client import LatokenClient
+
+
+class SymbolIndex:
+    """Bidirectional index of currency and pair ids and tags
+
+    Built once from getCurrencies and getActivePairs, all lookups are dict lookups afterwards.
+    It can be saved to a local file for instant startup and kept up to date by messages
+    from streamCurrencies and streamPairs.
+
+    .. code block:: python
+
+        index = SymbolIndex.fromClient(latoken)
+        index.save('symbols.json')
+        ...
+        index = SymbolIndex.load('symbols.json')
+        index.currencyTag('92151d82-df98-4d88-9a4d-284fa9eca49f')   # 'BTC'
+        index.currencyId('btc')                                     # '92151d82-df98-4d88-9a4d-284fa9eca49f'
+        index.pairId('BTC/USDT')                                    # Pair id
+        index.pairTag(index.pairId('BTC/USDT'))                     # 'BTC/USDT'
+
+    """
+
+    def __init__(self, currencies: Optional[list] = None, pairs: Optional[list] = None,
+                 json_loads: Optional[Callable] = None):
+        """
+        :param json_loads: optional, function decoding bodies of stream messages, defaults to the client decoder
+        """
+        self.json_loads = json_loads
+        self.currency_tags = dict()    # currency id: tag
+        self.currency_ids = dict()     # tag: currency id
+        self.pair_currencies = dict()  # pair id: (base currency id, quote currency id)
+        self.pair_ids = dict()         # pair tag (***/***): pair id
+        self.pair_tags = dict()        # pair id: pair tag (***/***)
+        self.updateCurrencies(currencies or [])
+        self.updatePairs(pairs or [])
+
+    @classmethod
+    def fromClient(cls, client: Optional['LatokenClient'] = None) -> 'SymbolIndex':
+        """Builds the index by downloading currencies and active pairs"""
+
+        from latoken.client import LatokenClient
+
+        client = client or LatokenClient()
+        return cls(client._decode(client.getCurrencies()), client._decode(client.getActivePairs()),
+                   json_loads = client.json_loads)
+
+    @classmethod
+    def load(cls, path: str) -> 'SymbolIndex':
+        """Builds the index from a file written by save"""
+
+        with open(path, 'r') as file:
+            data = json.load(file)
+
+        index = cls()
+        index.currency_tags = data['currencies']
+        index.currency_ids = {tag: currency_id for currency_id, tag in index.currency_tags.items()}
+        index.pair_currencies = {pair_id: tuple(currencies) for pair_id, currencies in data['pairs'].items()}
+        index._resolvePairs(index.pair_currencies)
+        return index
+
+    def save(self, path: str):
+        with open(path, 'w') as file:
+            json.dump({'currencies': self.currency_tags, 'pairs': self.pair_currencies}, file)
+
+    def _resolvePairs(self, pair_ids):
+        for pair_id in pair_ids:
+            base, quote = self.pair_currencies[pair_id]
+            if base in self.currency_tags and quote in self.currency_tags:
+                tag = self.currency_tags[base] + '/' + self.currency_tags[quote]
+                previous = self.pair_tags.get(pair_id)
+                if previous is not None and previous != tag:
+                    self.pair_ids.pop(previous, None)
+                self.pair_tags[pair_id] = tag
+                self.pair_ids[tag] = pair_id
+
+    def updateCurrencies(self, currencies: list):
+        """Adds or updates currencies given in getCurrencies format"""
+
+        updated = set()
+        for currency in currencies:
+            previous = self.currency_tags.get(currency['id'])
+            if previous is not None and previous != currency['tag']:
+                self.currency_ids.pop(previous, None)
+            self.currency_tags[currency['id']] = currency['tag']
+            self.currency_ids[currency['tag']] = currency['id']
+            updated.add(currency['id'])
+
+        # Pairs only need new tags if one of their currencies changed
+        if updated:
+            self._resolvePairs([pair_id for pair_id, currencies in self.pair_currencies.items()
+                                if currencies[0] in updated or currencies[1] in updated])
+
+    def updatePairs(self, pairs: list):
+        """Adds or updates pairs given in getActivePairs format"""
+
+        for pair in pairs:
+            previous = self.pair_tags.pop(pair['id'], None)
+            if previous is not None:
+                self.pair_ids.pop(previous, None)
+            self.pair_currencies[pair['id']] = (pair['baseCurrency'], pair['quoteCurrency'])
+        self._resolvePairs([pair['id'] for pair in pairs])
+
+    def update(self, message: dict):
+        """Applies a message of streamCurrencies or streamPairs, other messages are ignored
+
+        The body can be a json string or already decoded (connect with decode = True)
+        """
+
+        from latoken.client import LatokenClient
+
+        destination = message['headers'].get('destination')
+        if destination not in (LatokenClient.currencies_stream, LatokenClient.pairs_stream):
+            return
+
+        body = message['body']
+        if isinstance(body, (bytes, str)):
+            from latoken.decoder import loads
+
+            body = (self.json_loads or loads)(body)
+        if destination == LatokenClient.currencies_stream:
+            self.updateCurrencies(body['payload'])
+        else:
+            self.updatePairs(body['payload'])
+
+    def currencyTag(self, currency_id: str) -> str:
+        return self.currency_tags[currency_id]
+
+    def currencyId(self, tag: str) -> str:
+        return self.currency_ids[tag.upper()]
+
+    def pairTag(self, pair_id: str) -> str:
+        return self.pair_tags[pair_id]
+
+    def pairId(self, pair: str) -> str:
+        """Returns pair id by pair tag, pair should be of format ***/***"""
+
+        return self.pair_ids[pair.upper()]
+
+    def pairCurrencyIds(self, pair: str) -> str:
+        """Returns pair of format ***/*** with currency ids instead of tags, as required by the streams"""
+
+        return '/'.join(self.pair_currencies[self.pairId(pair)])
+
+
+_index = None
 
 
 def currencyConverter(currency_ids: Optional[list] = None, currency_tags: Optional[list] = None) -> list:
@@ -27,13 +176,17 @@ def currencyConverter(currency_ids: Optional[list] = None, currency_tags: Option
 
     """
 
-    response = LatokenClient().getCurrencies()
-    
+    # Currencies are only downloaded on the first call
+    global _index
+    if _index is None:
+        from latoken.client import LatokenClient
+
+        client = LatokenClient()
+        _index = SymbolIndex(currencies = client._decode(client.getCurrencies()))
+
     if currency_ids:
-        mapper = {i['id']: i['tag'] for i in response}
-        return [mapper[i] for i in currency_ids]
+        return [_index.currency_tags[i] for i in currency_ids]
     elif currency_tags:
-        mapper = {i['tag']: i['id'] for i in response}
-        return [mapper[i] for i in currency_tags]
+        return [_index.currency_ids[i] for i in currency_tags]
     else:
         return print('No list of currency_ids or currency_tags provided')
\ No newline at end of file
@@ -0,0 +1,51 @@
+from typing import Optional
+
+
+class HistoryCursor:
+    """Timestamp cursor that walks history of getTrades and getOrders backwards
+
+    Each page is requested with the oldest timestamp of the previous page, so records at that
+    timestamp can be returned twice and are de-duplicated by id.
+
+    :param since: optional, timestamp in milliseconds, older records are not returned
+    :param until: optional, timestamp in milliseconds to start from, defaults to current
+    :param limit: number of records requested per page
+    """
+
+    __slots__ = ('since', 'limit', 'timestamp', 'boundary', 'done')
+
+    def __init__(self, since: Optional[int] = None, until: Optional[int] = None, limit: int = 100):
+        self.since = since
+        self.limit = limit
+        self.timestamp = until
+        self.boundary = set()  # Ids of returned records at the cursor timestamp
+        self.done = False
+
+    def advance(self, page) -> list:
+        """Moves the cursor past a page, returns records of the page that were not returned before"""
+
+        if isinstance(page, dict):
+            if 'id' not in page:
+                raise ValueError(f'Unexpected history response: {page}')
+            page = [page]
+
+        if not page:
+            self.done = True
+            return []
+
+        records = [record for record in page
+                   if record['id'] not in self.boundary and (self.since is None or record['timestamp'] >= self.since)]
+        oldest = min(record['timestamp'] for record in page)
+
+        if not records and len(page) >= self.limit and oldest == self.timestamp:
+            # The whole page is at one timestamp, the rest of it can only be reached by stepping over it
+            self.timestamp = oldest - 1
+            self.boundary = set()
+            return []
+
+        if oldest != self.timestamp:
+            self.boundary = set()
+        self.boundary.update(record['id'] for record in page if record['timestamp'] == oldest)
+        self.timestamp = oldest
+        self.done = len(page) < self.limit or (self.since is not None and oldest < self.since) or not records
+        return records
@@ -0,0 +1,153 @@
+import threading
+from bisect import bisect_left
+from functools import lru_cache
+from time import perf_counter
+from typing import Callable
+
+
+# Request phases in the order they happen, phases that didn't happen for a request are not recorded
+PHASES = ('queue', 'sign', 'dns', 'connect', 'tls', 'ttfb', 'download', 'decode', 'total')
+
+# Upper bounds of histogram buckets in milliseconds, the last bucket collects everything slower
+BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    __slots__ = ('count', 'total', 'min', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.buckets[bisect_left(BUCKETS, value)] += 1
+
+    def toDict(self) -> dict:
+        return {
+            'count': self.count,
+            'mean': self.total / self.count,
+            'min': self.min,
+            'max': self.max,
+            'buckets': dict(zip(BUCKETS + (float('inf'),), self.buckets))
+        }
+
+
+class Instrumentation:
+    """Per-endpoint histograms of request phases in milliseconds
+
+    Endpoints are keyed by the call templates of the client (for example '/v2/book/{currency}/{quote}'),
+    so requests to different pairs or ids share the same histograms.
+
+    Phases are queue (waiting for the rate limiter), sign, dns, connect and tls (only when a new connection
+    is opened), ttfb (from sending the request to receiving response headers), download, decode and total.
+    LatokenClient times dns as a part of connect, AsyncLatokenClient times tls as a part of connect.
+
+    .. code block:: python
+
+        latoken = LatokenClient(instrumentation = True)
+        latoken.instrumentation.addHook(lambda endpoint, phases: print(endpoint, phases['total']))
+        ...
+        latoken.instrumentation.snapshot()
+
+        {
+            '/v2/book/{currency}/{quote}': {
+                'ttfb': {'count': 120, 'mean': 41.2, 'min': 35.1, 'max': 95.8, 'buckets': {..., 50: 117, 100: 3, ...}},
+                'download': {...},
+                ...
+            },
+            ...
+        }
+
+    """
+
+    def __init__(self):
+        self.histograms = dict()  # endpoint: {phase: Histogram}
+        self.hooks = []
+        self._lock = threading.Lock()
+
+    def addHook(self, hook: Callable):
+        """Adds a function that is called with endpoint template and dict of phases after each request"""
+
+        self.hooks.append(hook)
+
+    def record(self, endpoint: str, phases: dict):
+        with self._lock:
+            histograms = self.histograms.setdefault(endpoint, dict())
+            for phase, value in phases.items():
+                if phase not in histograms:
+                    histograms[phase] = Histogram()
+                histograms[phase].add(value)
+
+        for hook in self.hooks:
+            hook(endpoint, phases)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                endpoint: {phase: histograms[phase].toDict() for phase in PHASES if phase in histograms}
+                for endpoint, histograms in self.histograms.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+
+
+# Phases of the connection opened by the current thread, set by LatokenClient around each instrumented request
+connectionPhases = threading.local()
+
+
+def _timed(connect: Callable, phase: str) -> Callable:
+    def wrapper(self, *args, **kwargs):
+        phases = getattr(connectionPhases, 'phases', None)
+        if phases is None:
+            return connect(self, *args, **kwargs)
+
+        started = perf_counter()
+        try:
+            return connect(self, *args, **kwargs)
+        finally:
+            phases[phase] = phases.get(phase, 0.0) + (perf_counter() - started) * 1000
+
+    return wrapper
+
+
+def splitConnectPhases(phases: dict) -> dict:
+    """TLS is timed around the whole HTTPS connect, so the TCP connect time is taken out of it"""
+
+    if 'tls' in phases:
+        phases['tls'] = max(phases['tls'] - phases.get('connect', 0.0), 0.0)
+    return phases
+
+
+@lru_cache(maxsize = None)
+def timedPoolClasses() -> dict:
+    """Returns pool classes by scheme for a urllib3 PoolManager, their connections time connect and tls phases
+
+    The classes are created on the first call, so that urllib3 is not imported together with the client
+    """
+
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    class TimedHTTPConnection(HTTPConnection):
+        _new_conn = _timed(HTTPConnection._new_conn, 'connect')
+
+    class TimedHTTPSConnection(HTTPSConnection):
+        _new_conn = _timed(HTTPSConnection._new_conn, 'connect')
+        connect = _timed(HTTPSConnection.connect, 'tls')
+
+    class TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = TimedHTTPConnection
+
+    class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = TimedHTTPSConnection
+
+    return {'http': TimedHTTPConnectionPool, 'https': TimedHTTPSConnectionPool}
@@ -0,0 +1,507 @@
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import subprocess
+import sys
+import threading
+import zlib
+from contextlib import contextmanager
+from time import time
+from typing import Optional
+
+from aiohttp import WSMsgType, web
+
+from latoken.client import LatokenClient
+
+
+def mockId(number: int) -> str:
+    """Returns a stable id of the same format as exchange ids"""
+
+    return f'{number:08x}-0000-4000-8000-{number:012x}'
+
+
+class MockServer:
+    """Local stand-in for LATOKEN REST API and STOMP websockets, for tests and benchmarks
+
+    Every GET call of LatokenClient is answered with synthetic data of the documented format, POST calls
+    (orders, transfers, withdrawals) are accepted with a SUCCESS status,
+    and every subscription is fed with messages at a configured rate. Requires aiohttp.
+
+    :param latency: optional, seconds added to each REST responce, defaults to 0
+    :param currencies: number of currencies, defaults to 300
+    :param pairs: number of pairs, defaults to 1000
+    :param book_levels: max number of price levels per orderbook side, defaults to 1000
+    :param history: number of records in trades, orders, transfers and transactions history, defaults to 10000
+    :param message_rate: messages per second sent to each subscription, 0 sends as fast as possible, defaults to 100
+    :param message_rates: optional, dict of message rates by destination that differ from message_rate
+    :param message_levels: number of price level changes in each book message, defaults to 10
+    :param compression: defaults to True (REST responses of 1 KB or more are compressed by an accepted encoding)
+    :param bandwidth: optional, bytes per second of simulated REST downloads, defaults to None (no limit)
+    :param heartbeat: milliseconds between STOMP heart-beats the server sends and expects, defaults to 0 (none)
+
+    .. code block:: python
+
+        with MockServer(latency = 0.02) as server:
+            latoken = LatokenClient(baseAPI = server.baseAPI, baseWS = server.baseWS)
+            latoken.getOrderbook('BTC/USDT')
+
+    """
+
+    user_id = mockId(0)
+
+    # Number of distinct messages sent to a subscription before they repeat
+    frame_cycle = 100
+
+    def __init__(self, latency: Optional[float] = 0, currencies: int = 300, pairs: int = 1000,
+                 book_levels: int = 1000, history: int = 10000, message_rate: float = 100,
+                 message_rates: Optional[dict] = None, message_levels: int = 10,
+                 compression: bool = True, bandwidth: Optional[float] = None, heartbeat: int = 0,
+                 host: str = '127.0.0.1', port: int = 0):
+        self.latency = latency
+        self.currencies = currencies
+        self.pairs = pairs
+        self.book_levels = book_levels
+        self.history = history
+        self.message_rate = message_rate
+        self.message_rates = message_rates or dict()
+        self.message_levels = message_levels
+        self.compression = compression
+        self.bandwidth = bandwidth
+        self.heartbeat = heartbeat
+        self.frozen = False
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self.messages = 0
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self._sockets = set()
+
+    @property
+    def baseAPI(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    @property
+    def baseWS(self) -> str:
+        return f'ws://{self.host}:{self.port}/stomp'
+
+    # LIFECYCLE
+
+    def start(self) -> 'MockServer':
+        """Starts the server in a background thread, port is assigned if it was 0"""
+
+        started = threading.Event()
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self._start())
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target = serve, daemon = True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    async def _start(self):
+        app = web.Application()
+        app.router.add_get('/stomp', self._stomp)
+        app.router.add_route('*', '/{path:.*}', self._rest)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port, backlog = 1024)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    def stop(self):
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._stop(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = None
+
+    async def _stop(self):
+        # Open websockets would keep the server waiting for their handlers on cleanup
+        for ws in list(self._sockets):
+            await ws.close()
+        await self._runner.cleanup()
+
+    def freeze(self, frozen: bool = True):
+        """Stops sending anything to open websockets while keeping them open, as a connection that silently died"""
+
+        self.frozen = frozen
+
+    def dropConnections(self):
+        """Closes all open websockets from the server side"""
+
+        async def drop():
+            for ws in list(self._sockets):
+                await ws.close()
+
+        asyncio.run_coroutine_threadsafe(drop(), self._loop).result()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    # REST
+
+    def _currency(self, number: int) -> dict:
+        return {
+            'id': mockId(number), 'status': 'CURRENCY_STATUS_ACTIVE', 'type': 'CURRENCY_TYPE_CRYPTO',
+            'name': f'Currency {number}', 'tag': f'C{number}', 'description': '', 'logo': '', 'decimals': 8,
+            'created': 1572912000000, 'tier': 1, 'assetClass': 'ASSET_CLASS_UNKNOWN', 'minTransferAmount': 0
+        }
+
+    def _pairCurrencies(self, number: int) -> tuple:
+        quote = number % 4
+        base = 4 + number % max(self.currencies - 4, 1)
+        return mockId(base), mockId(quote)
+
+    def _pair(self, number: int) -> dict:
+        base, quote = self._pairCurrencies(number)
+        return {
+            'id': mockId(100000 + number), 'status': 'PAIR_STATUS_ACTIVE', 'baseCurrency': base, 'quoteCurrency': quote,
+            'priceTick': '0.010000000000000000', 'priceDecimals': 2, 'quantityTick': '0.000010000',
+            'quantityDecimals': 5, 'costDisplayDecimals': 9, 'created': 1625153024491, 'minOrderQuantity': '0',
+            'maxOrderCostUsd': '999999999999999999', 'minOrderCostUsd': '0', 'externalSymbol': ''
+        }
+
+    def _ticker(self, number: int) -> dict:
+        base, quote = self._pairCurrencies(number)
+        return {
+            'symbol': f'C{int(base[-12:], 16)}/C{int(quote[-12:], 16)}', 'baseCurrency': base, 'quoteCurrency': quote,
+            'volume24h': '1177568.232859658500000000', 'volume7d': '8177568.232859658500000000',
+            'change24h': '0.28', 'change7d': '-0.71', 'lastPrice': '12.02347082'
+        }
+
+    def _levels(self, count: int, start: float, step: float) -> list:
+        return [{'price': f'{start + step * level:.2f}', 'quantity': '0.0081', 'cost': '377.190189',
+                 'accumulated': '377.190189'} for level in range(count)]
+
+    def _trade(self, number: int, timestamp: int) -> dict:
+        return {
+            'id': mockId(200000 + number), 'isMakerBuyer': False, 'direction': 'TRADE_DIRECTION_SELL',
+            'baseCurrency': mockId(4), 'quoteCurrency': mockId(0), 'price': '30000.00', 'quantity': '0.03500',
+            'cost': '1050.00', 'fee': '4.095000000000000000', 'order': mockId(300000 + number),
+            'timestamp': timestamp, 'makerBuyer': False
+        }
+
+    def _order(self, number: int, timestamp: int) -> dict:
+        return {
+            'id': mockId(300000 + number), 'status': 'ORDER_STATUS_CLOSED', 'side': 'ORDER_SIDE_SELL',
+            'condition': 'ORDER_CONDITION_GOOD_TILL_CANCELLED', 'type': 'ORDER_TYPE_LIMIT',
+            'baseCurrency': mockId(4), 'quoteCurrency': mockId(0), 'clientOrderId': f'order {number}',
+            'price': '3.6200', 'quantity': '100.000', 'cost': '362.0000000', 'filled': '100.000',
+            'trader': self.user_id, 'timestamp': timestamp
+        }
+
+    def _transfer(self, number: int) -> dict:
+        return {
+            'id': mockId(400000 + number), 'status': 'TRANSFER_STATUS_CONFIRMED', 'type': 'TRANSFER_TYPE_INTER_USER',
+            'transferringFunds': '10', 'usdValue': '10', 'timestamp': 1629539250161 - number * 1000,
+            'direction': 'OUTCOME', 'method': 'TRANSFER_METHOD_DIRECT', 'currency': mockId(0),
+            'fromUser': self.user_id, 'toUser': mockId(1), 'fee': None
+        }
+
+    def _transaction(self, number: int) -> dict:
+        return {
+            'id': mockId(500000 + number), 'status': 'TRANSACTION_STATUS_CONFIRMED',
+            'type': 'TRANSACTION_TYPE_WITHDRAWAL', 'senderAddress': '', 'recipientAddress': f'mock address {number}',
+            'amount': '20.000000000000000000', 'transactionFee': '3.000000000000000000',
+            'timestamp': 1629561656406 - number * 1000, 'transactionHash': f'{number:064x}', 'blockHeight': 0,
+            'currency': mockId(0), 'memo': None, 'paymentProvider': mockId(700000), 'requiresCode': False
+        }
+
+    def _balance(self, number: int) -> dict:
+        return {
+            'id': mockId(800000 + number), 'status': 'ACCOUNT_STATUS_ACTIVE', 'type': 'ACCOUNT_TYPE_SPOT',
+            'timestamp': int(time() * 1000), 'currency': mockId(number), 'available': '100.830064349760000000',
+            'blocked': '0.000000'
+        }
+
+    def _binding(self, number: int, currency: str) -> dict:
+        """Even numbers are INPUT (deposit) bindings, odd ones are OUTPUT (withdrawal) bindings"""
+
+        output = number % 2
+        return {
+            'id': mockId(900000 + number), 'currencyProvider': mockId(700000), 'status': 'CURRENCY_BINDING_STATUS_ACTIVE',
+            'type': ('CURRENCY_BINDING_TYPE_INPUT', 'CURRENCY_BINDING_TYPE_OUTPUT')[output],
+            'currency': currency, 'minAmount': '0.001000000000000000', 'fee': ('0', '0.000500000000000000')[output],
+            'percentFee': '1.000000000000000000', 'warning': '', 'feeCurrency': currency, 'title': 'Mock Wallet',
+            'confirmationBlocks': 2, 'memoSupported': False, 'decimals': 8, 'config': {}, 'providerName': 'MOCK',
+            'restrictedCountries': []
+        }
+
+    def _chart(self, number: int) -> list:
+        return [1.375e-05 * (1 + (number + week) % 10 / 100) for week in range(169)]
+
+    def _timeline(self, query, build) -> list:
+        """History of records one second apart, walked back from the "from" timestamp as the exchange does"""
+
+        newest = 1624373391929
+        until = min(int(query.get('from', newest)), newest)
+        limit = int(query.get('limit', 100))
+        first = (newest - until + 999) // 1000
+        return [build(number, newest - number * 1000) for number in range(first, min(first + limit, self.history))]
+
+    def _page(self, query, build) -> dict:
+        page, size = int(query.get('page', 0)), int(query.get('size', 10))
+        content = [build(number) for number in range(page * size, min((page + 1) * size, self.history))]
+        return {'hasNext': (page + 1) * size < self.history, 'content': content, 'first': page == 0,
+                'pageSize': size, 'hasContent': bool(content)}
+
+    def _candles(self, query) -> dict:
+        symbol, resolution = query['symbol'], query['resolution']
+        step = {'1m': 60, '1h': 3600, '4h': 14400, '6h': 21600, '12h': 43200, '1d': 86400}.get(resolution, 86400)
+        start = (int(query['from']) + step - 1) // step * step
+        t = list(range(start, int(query['to']), step))
+        prices = [f'{30000 + (timestamp // step) % 1000:.18f}' for timestamp in t]
+        return {'o': prices, 'c': prices, 'l': prices, 'h': prices, 't': t, 'v': ['1000.5'] * len(t),
+                's': 'ok' if t and symbol else 'no_data'}
+
+    def _response(self, template: str, request: web.Request):
+        query = request.query
+        client = LatokenClient
+
+        if template == client.time_call:
+            return {'serverTime': int(time() * 1000)}
+        if template == client.user_info_call:
+            return {'id': self.user_id, 'status': 'ACTIVE', 'role': 'INVESTOR', 'email': 'mock@example.com',
+                    'phone': '', 'authorities': [], 'forceChangePassword': None, 'authType': 'API_KEY', 'socials': []}
+        if template == client.orderbook_call:
+            levels = min(int(query.get('limit', 1000)), self.book_levels)
+            return {'ask': self._levels(levels, 30000.01, 0.01), 'bid': self._levels(levels, 30000.0, -0.01),
+                    'totalAsk': '3.4354', 'totalBid': '204967.154792'}
+        if template == client.active_currency_call:
+            return [self._currency(number) for number in range(self.currencies)]
+        if template == client.currency_call:
+            return self._currency(4)
+        if template == client.quote_currency_call:
+            return [mockId(number) for number in range(4)]
+        if template == client.active_pairs_call:
+            return [self._pair(number) for number in range(self.pairs)]
+        if template == client.tickers_call:
+            return [self._ticker(number) for number in range(self.pairs)]
+        if template == client.tickers_per_pair_call:
+            return self._ticker(0)
+        if template in (client.trades_all_call, client.trades_user_call, client.trades_user_pair_call):
+            return self._timeline(query, self._trade)
+        if template in (client.order_all_call, client.order_pair_all_call, client.order_pair_active_call):
+            return self._timeline(query, self._order)
+        if template == client.order_status_call:
+            return dict(self._order(0, 1624373391929), id = request.path.rsplit('/', 1)[-1])
+        if template == client.candles_call.split('?')[0]:
+            return self._candles(query)
+        if template == client.transfer_get_all_call:
+            return self._page(query, self._transfer)
+        if template == client.transaction_all_call:
+            return self._page(query, self._transaction)
+        if template == client.transaction_by_id_call:
+            return dict(self._transaction(0), id = request.path.rsplit('/', 1)[-1])
+        if template == client.account_balances_call:
+            return [self._balance(number) for number in range(self.currencies)]
+        if template == client.currency_balance_by_type_call:
+            currency, account_type = request.path.split('/')[-2:]
+            return dict(self._balance(4), currency = currency, type = account_type)
+        if template == client.weekly_chart_call:
+            return {mockId(number): self._chart(number) for number in range(self.currencies)}
+        if template == client.weekly_chart_by_pair_call:
+            return self._chart(0)
+        if template == client.bindings_active_call:
+            keys = ('minAmount', 'fee', 'percentFee', 'providerName', 'id', 'currencyProvider')
+            outputs = [self._binding(2 * number + 1, mockId(number)) for number in range(self.currencies)]
+            return [{'id': mockId(number), 'tag': f'C{number}', 'bindings': [{key: binding[key] for key in keys}]}
+                    for number, binding in enumerate(outputs)]
+        if template == client.bindings_active_currencies_call:
+            currencies = [mockId(number) for number in range(self.currencies)]
+            return {'inputs': currencies, 'outputs': currencies}
+        if template == client.bindings_currency_call:
+            currency = request.path.rsplit('/', 1)[-1]
+            return [self._binding(0, currency), self._binding(1, currency)]
+        if template == client.fee_levels_call:
+            return [{'makerFee': '0.0049', 'takerFee': '0.0049', 'type': 'FEE_SCHEME_TYPE_PERCENT_QUOTE',
+                     'take': 'FEE_SCHEME_TAKE_PROPORTION'}]
+        if template in (client.fee_scheme_per_pair_call, client.fee_scheme_par_pair_and_user_call):
+            return {'makerFee': '0.004900000000000000', 'takerFee': '0.004900000000000000',
+                    'type': 'FEE_SCHEME_TYPE_PERCENT_QUOTE', 'take': 'FEE_SCHEME_TAKE_PROPORTION'}
+        if request.method == 'POST':
+            return {'message': 'mock request accepted', 'status': 'SUCCESS', 'id': mockId(600000 + self.requests)}
+        return {}
+
+    async def _rest(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        path = '/' + request.match_info['path']
+        template = path
+        for pattern, call in LatokenClient._callPatterns():
+            if pattern.fullmatch(path):
+                template = call
+                break
+
+        body = json.dumps(self._response(template, request)).encode()
+        headers = dict()
+        if self.compression and len(body) >= 1024:
+            encoding, body = self._compress(body, request.headers.get('Accept-Encoding', ''))
+            if encoding:
+                headers['Content-Encoding'] = encoding
+
+        if self.bandwidth:
+            await asyncio.sleep(len(body) / self.bandwidth)
+
+        return web.Response(body = body, content_type = 'application/json', headers = headers)
+
+    def _compress(self, body: bytes, accept_encoding: str) -> tuple:
+        """Compressing by the best accepted encoding, returns the encoding or None if nothing is accepted"""
+
+        accepted = {encoding.split(';')[0].strip() for encoding in accept_encoding.split(',')}
+        if 'br' in accepted:
+            try:
+                import brotli
+                return 'br', brotli.compress(body, quality = 5)
+            except ImportError:
+                pass
+        if 'gzip' in accepted:
+            return 'gzip', gzip.compress(body, compresslevel = 6)
+        if 'deflate' in accepted:
+            return 'deflate', zlib.compress(body, 6)
+        return None, body
+
+    # STOMP
+
+    def _body(self, destination: str, nonce: int) -> str:
+        timestamp = int(time() * 1000)
+        if destination.startswith('/v1/book/'):
+            levels = [{'price': f'{30000 + (nonce + level) % 100:.2f}', 'quantityChange': '0.1', 'costChange': '3000',
+                       'quantity': '1.5', 'cost': '45000'} for level in range(self.message_levels)]
+            payload = {'ask': levels, 'bid': levels}
+        elif destination.startswith('/v1/trade/'):
+            payload = [self._trade(nonce, timestamp)]
+        elif destination.startswith('/v1/ticker/'):
+            payload = self._ticker(0)
+        elif destination == LatokenClient.currencies_stream:
+            payload = [self._currency(number) for number in range(self.currencies)]
+        elif destination == LatokenClient.pairs_stream:
+            payload = [self._pair(number) for number in range(self.pairs)]
+        else:
+            payload = []
+        return json.dumps({'payload': payload, 'nonce': nonce, 'timestamp': timestamp})
+
+    async def _publish(self, ws: web.WebSocketResponse, destination: str, subscription: str):
+        # Messages are sent in batches every 10 ms, so that high rates don't depend on sleep precision
+        rate = self.message_rates.get(destination, self.message_rate)
+        batch = max(1, int(rate / 100)) if rate else 100
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        # A cycle of frames is built once, so that building messages doesn't limit the rate of the feed
+        frames = []
+        for nonce in range(self.frame_cycle):
+            body = self._body(destination, nonce)
+            frames.append((f'MESSAGE\ndestination:{destination}\nmessage-id:{mockId(nonce)}\n'
+                           f'content-length:{len(body)}\nsubscription:{subscription}\n\n{body}\x00').encode())
+
+        nonce = 0
+        while not ws.closed:
+            if self.frozen:
+                await asyncio.sleep(0.01)
+                continue
+            for _ in range(batch):
+                await ws.send_bytes(frames[nonce % self.frame_cycle])
+                nonce += 1
+                self.messages += 1
+            # Sleeping until the schedule of the rate, so time spent on sending doesn't lower it
+            await asyncio.sleep(max(started + nonce / rate - loop.time(), 0) if rate else 0)
+
+    async def _sendHeartbeats(self, ws: web.WebSocketResponse, interval: float):
+        while not ws.closed:
+            await asyncio.sleep(interval)
+            if not self.frozen:
+                await ws.send_bytes(b'\n')
+
+    async def _stomp(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._sockets.add(ws)
+        publishers = dict()  # subscription id: task
+
+        try:
+            async for message in ws:
+                if message.type not in (WSMsgType.TEXT, WSMsgType.BINARY):
+                    break
+                frame = message.data if message.type == WSMsgType.TEXT else message.data.decode()
+                lines = frame.strip('\x00\n').split('\n')
+                headers = dict(line.split(':', 1) for line in lines[1:] if ':' in line)
+
+                if lines[0] in ('CONNECT', 'STOMP'):
+                    await ws.send_bytes(f'CONNECTED\nversion:1.1\nheart-beat:{self.heartbeat},{self.heartbeat}\n\n\x00'
+                                        .encode())
+                    wanted = int(headers.get('heart-beat', '0,0').split(',')[1])
+                    if self.heartbeat and wanted:
+                        publishers[None] = asyncio.ensure_future(
+                            self._sendHeartbeats(ws, max(self.heartbeat, wanted) / 1000)
+                        )
+                elif lines[0] == 'SUBSCRIBE':
+                    publishers[headers['id']] = asyncio.ensure_future(
+                        self._publish(ws, headers['destination'], headers['id'])
+                    )
+                elif lines[0] == 'UNSUBSCRIBE' and headers.get('id') in publishers:
+                    publishers.pop(headers['id']).cancel()
+                elif lines[0] == 'DISCONNECT':
+                    break
+        finally:
+            for publisher in publishers.values():
+                publisher.cancel()
+            self._sockets.discard(ws)
+
+        return ws
+
+
+@contextmanager
+def spawnMockServer(**options):
+    """Runs MockServer in a separate process, so that it doesn't compete with the measured client for the GIL
+
+    :param options: MockServer arguments, yields an object with baseAPI and baseWS of the server
+
+    .. code block:: python
+
+        with spawnMockServer(message_rate = 0) as server:
+            asyncio.run(LatokenClient(baseWS = server.baseWS).connect(streams, on_message = consumer))
+
+    """
+
+    arguments = [f'--{name.replace("_", "-")}={json.dumps(value) if isinstance(value, dict) else value}'
+                 for name, value in options.items()]
+    # The server process imports the same latoken package, even if it is run from a source checkout
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH = os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')])))
+    process = subprocess.Popen([sys.executable, '-m', 'latoken.mock', *arguments], stdout = subprocess.PIPE, text = True,
+                               env = env)
+    try:
+        server = MockServer(port = int(process.stdout.readline()))
+        yield server
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Local stand-in for LATOKEN REST API and STOMP websockets')
+    parser.add_argument('--port', type = int, default = 0, help = 'defaults to any free port, printed once started')
+    for name in ('latency', 'bandwidth', 'message_rate'):
+        parser.add_argument('--' + name.replace('_', '-'), type = float)
+    for name in ('currencies', 'pairs', 'book_levels', 'history', 'message_levels', 'heartbeat'):
+        parser.add_argument('--' + name.replace('_', '-'), type = int)
+    parser.add_argument('--compression', type = lambda value: value.lower() in ('1', 'true', 'yes'))
+    parser.add_argument('--message-rates', type = json.loads, help = 'JSON object of message rates by destination')
+    options = {name: value for name, value in vars(parser.parse_args()).items() if value is not None}
+
+    server = MockServer(**options).start()
+    print(server.port, flush = True)
+    server._thread.join()
@@ -0,0 +1,126 @@
+from decimal import Decimal
+from typing import Callable
+
+
+class Model:
+    """Base of typed response records
+
+    Attributes are named as the keys of the exchange response. Numeric fields are parsed from
+    decimal strings once, by Decimal (default) or float, other fields are kept as they are.
+
+    .. code block:: python
+
+        trades = Trade.fromList(latoken.getTrades(pair = 'BTC/USDT'))
+        asks = BookLevel.fromList(latoken.getOrderbook('BTC/USDT')['ask'], number = float)
+        trades[0].price   # Decimal('30000.00')
+
+    """
+
+    __slots__ = ()
+    _fields = ()
+    _numbers = ()
+
+    def __init__(self, **kwargs):
+        for field in self.__slots__:
+            setattr(self, field, kwargs.get(field))
+
+    @classmethod
+    def fromDict(cls, data: dict, number: Callable = Decimal):
+        record = cls.__new__(cls)
+        for field in cls._fields:
+            setattr(record, field, data.get(field))
+        for field in cls._numbers:
+            value = data.get(field)
+            setattr(record, field, number(value) if value not in (None, '') else None)
+        return record
+
+    @classmethod
+    def fromList(cls, data: list, number: Callable = Decimal) -> list:
+        """Builds records from a list of response dicts"""
+
+        fromDict = cls.fromDict
+        return [fromDict(item, number) for item in data]
+
+    def toDict(self) -> dict:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and self.toDict() == other.toDict()
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{field}={getattr(self, field)!r}' for field in self.__slots__)
+        return f'{type(self).__name__}({fields})'
+
+
+class Trade(Model):
+    """Record of getTrades and streamTrades"""
+
+    _fields = ('id', 'direction', 'baseCurrency', 'quoteCurrency', 'order', 'timestamp', 'makerBuyer')
+    _numbers = ('price', 'quantity', 'cost', 'fee')
+    __slots__ = _fields + _numbers
+
+
+class Order(Model):
+    """Record of getOrders and streamOrders"""
+
+    _fields = ('id', 'status', 'side', 'condition', 'type', 'baseCurrency', 'quoteCurrency', 'clientOrderId',
+               'trader', 'timestamp')
+    _numbers = ('price', 'quantity', 'cost', 'filled')
+    __slots__ = _fields + _numbers
+
+
+class BookLevel(Model):
+    """Price level of getOrderbook and streamBook (changes are only present in stream messages)"""
+
+    _numbers = ('price', 'quantity', 'cost', 'accumulated', 'quantityChange', 'costChange')
+    __slots__ = _numbers
+
+
+class Ticker(Model):
+    """Record of getTickers and streamPairTickers"""
+
+    _fields = ('symbol', 'baseCurrency', 'quoteCurrency')
+    _numbers = ('volume24h', 'volume7d', 'change24h', 'change7d', 'lastPrice')
+    __slots__ = _fields + _numbers
+
+
+class Balance(Model):
+    """Record of getAccountBalances and streamAccounts"""
+
+    _fields = ('id', 'status', 'type', 'timestamp', 'currency')
+    _numbers = ('available', 'blocked')
+    __slots__ = _fields + _numbers
+
+
+
+# Typed decoders of stream messages, they replace the payload of a decoded body by records
+
+def payloadDecoder(model: type, number: Callable = Decimal) -> Callable:
+    """Returns a decoder of stream bodies with a record or a list of records of the model as payload
+
+    .. code block:: python
+
+        latoken.streamTrades(pairs = ['BTC/USDT'], handler = onTrades, decoder = payloadDecoder(Trade, number = float))
+
+    """
+
+    def decode(body: dict) -> dict:
+        payload = body.get('payload')
+        if isinstance(payload, list):
+            body['payload'] = model.fromList(payload, number)
+        elif isinstance(payload, dict):
+            body['payload'] = model.fromDict(payload, number)
+        return body
+
+    return decode
+
+
+def bookDecoder(number: Callable = Decimal) -> Callable:
+    """Returns a decoder of streamBook bodies with lists of BookLevel records as ask and bid of payload"""
+
+    def decode(body: dict) -> dict:
+        payload = body.get('payload') or dict()
+        body['payload'] = {side: BookLevel.fromList(payload.get(side) or [], number) for side in ('ask', 'bid')}
+        return body
+
+    return decode
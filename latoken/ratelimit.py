@@ -0,0 +1,154 @@
+import itertools
+import threading
+from time import monotonic
+from typing import Optional
+
+
+# Lanes in the order of priority, a request from a higher lane is always dispatched first
+LANE_CANCEL = 'cancel'
+LANE_TRADING = 'trading'
+LANE_PRIVATE = 'private'
+LANE_PUBLIC = 'public'
+
+LANES = (LANE_CANCEL, LANE_TRADING, LANE_PRIVATE, LANE_PUBLIC)
+
+
+class TokenBucket:
+    """Token bucket that refills at rate tokens per second up to capacity tokens"""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated = monotonic()
+
+    def delay(self, now: float) -> float:
+        """Returns seconds until a token is available, 0 if it is available now"""
+
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class RateLimiter:
+    """Client-side scheduler of REST requests
+
+    All requests share one token bucket, each lane may additionally be limited by its own bucket.
+    Waiting requests are dispatched by lane priority (cancel, trading, private, public) and then in
+    the order of arrival, so an order cancellation pre-empts all queued market data requests.
+
+    :param rate: requests per second allowed for all lanes together
+    :param burst: optional, number of requests that can be sent at once, defaults to rate
+    :param lanes: optional, own limits of the lanes as {lane: (rate, burst)}
+
+    .. code block:: python
+
+        limiter = RateLimiter(rate = 20, lanes = {'public': (5, 10)})
+        latoken = LatokenClient(apiKey = apiKey, apiSecret = apiSecret, rate_limiter = limiter)
+
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None, lanes: Optional[dict] = None):
+        self.bucket = TokenBucket(rate, burst)
+        self.laneBuckets = {lane: TokenBucket(*limit) for lane, limit in (lanes or {}).items()}
+        self.queue = []
+        self.dispatched = dict.fromkeys(LANES, 0)
+        self.waited = dict.fromkeys(LANES, 0.0)
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+
+    def _enqueue(self, lane: str) -> tuple:
+        ticket = (LANES.index(lane), next(self._order), lane)
+        self.queue.append(ticket)
+        self.queue.sort()
+        return ticket
+
+    def _dequeue(self, ticket: tuple, started: float):
+        self.queue.remove(ticket)
+        self.waited[ticket[2]] += monotonic() - started
+        self._condition.notify_all()
+
+    def _poll(self, ticket: tuple) -> float:
+        """Dispatching the ticket if it is its turn, otherwise returns seconds to wait before polling again"""
+
+        now = monotonic()
+        for waiting in self.queue:
+            laneBucket = self.laneBuckets.get(waiting[2])
+            # A lane that is out of its own limit doesn't hold up the lanes behind it
+            if laneBucket is not None and laneBucket.delay(now) > 0:
+                continue
+
+            delay = self.bucket.delay(now)
+            if waiting is not ticket or delay > 0:
+                return delay or 0.001
+
+            self.bucket.take()
+            if laneBucket is not None:
+                laneBucket.take()
+            self.dispatched[ticket[2]] += 1
+            return 0.0
+
+        return min(bucket.delay(now) for bucket in self.laneBuckets.values()) or 0.001
+
+    def acquire(self, lane: str = LANE_PUBLIC):
+        """Blocks until a request of the lane can be sent"""
+
+        started = monotonic()
+        with self._condition:
+            ticket = self._enqueue(lane)
+            try:
+                delay = self._poll(ticket)
+                while delay:
+                    self._condition.wait(delay)
+                    delay = self._poll(ticket)
+            finally:
+                self._dequeue(ticket, started)
+
+    async def acquireAsync(self, lane: str = LANE_PUBLIC):
+        """Waits without blocking the event loop until a request of the lane can be sent"""
+
+        import asyncio
+
+        started = monotonic()
+        with self._condition:
+            ticket = self._enqueue(lane)
+        try:
+            while True:
+                with self._condition:
+                    delay = self._poll(ticket)
+                if not delay:
+                    break
+                await asyncio.sleep(delay)
+        finally:
+            with self._condition:
+                self._dequeue(ticket, started)
+
+    def getMetrics(self) -> dict:
+        """Returns queue depth, dispatched requests and total seconds waited per lane
+
+        .. code block:: python
+
+            {
+                'cancel': {'queued': 0, 'dispatched': 12, 'waited': 0.004},
+                'trading': {'queued': 1, 'dispatched': 40, 'waited': 0.61},
+                'private': {'queued': 0, 'dispatched': 8, 'waited': 0.22},
+                'public': {'queued': 37, 'dispatched': 1210, 'waited': 95.3}
+            }
+
+        """
+
+        with self._condition:
+            queued = dict.fromkeys(LANES, 0)
+            for ticket in self.queue:
+                queued[ticket[2]] += 1
+            return {
+                lane: {'queued': queued[lane], 'dispatched': self.dispatched[lane], 'waited': self.waited[lane]}
+                for lane in LANES
+            }
@@ -0,0 +1,31 @@
+import hashlib
+import hmac
+from typing import Union
+
+
+def serialize(params: dict) -> str:
+    """Serializes params into the canonical query string that is signed and sent to the exchange"""
+
+    return '&'.join([f'{key}={value}' for key, value in params.items()])
+
+
+class Signer:
+    """HMAC-SHA512 signer keyed by the api secret once per client
+
+    Keying HMAC derives the inner and outer pads from the secret, so the keyed state is kept
+    and only cloned for each signature.
+    """
+
+    __slots__ = ('_hmac',)
+
+    def __init__(self, apiSecret: Union[bytes, str]):
+        if isinstance(apiSecret, str):
+            apiSecret = apiSecret.encode('ascii')
+        self._hmac = hmac.new(apiSecret, digestmod = hashlib.sha512)
+
+    def sign(self, message: str) -> str:
+        """Returns hex digest of the message signature"""
+
+        signature = self._hmac.copy()
+        signature.update(message.encode('ascii'))
+        return signature.hexdigest()
@@ -0,0 +1,669 @@
+import asyncio
+import random
+import threading
+from importlib.util import find_spec
+from time import perf_counter
+from typing import Callable, Optional, Union
+
+
+class AiohttpTransport:
+    """WebSocket transport on aiohttp, frames are received and sent by the event loop itself"""
+
+    def __init__(self):
+        self.session = None
+        self.ws = None
+
+    async def open(self, url: str):
+        import aiohttp
+
+        self.session = aiohttp.ClientSession()
+        try:
+            # Snapshots of currencies and pairs are larger than the default limit of 4 MB
+            self.ws = await self.session.ws_connect(url, max_msg_size = 0, autoping = True)
+        except Exception as error:
+            await self.session.close()
+            raise ConnectionError(f'Websocket connection failed: {error!r}') from error
+
+    async def send(self, data: str):
+        await self.ws.send_str(data)
+
+    async def recv(self) -> Union[bytes, str]:
+        import aiohttp
+
+        message = await self.ws.receive()
+        if message.type in (aiohttp.WSMsgType.BINARY, aiohttp.WSMsgType.TEXT):
+            return message.data
+        if message.type == aiohttp.WSMsgType.ERROR:
+            raise ConnectionError(f'Websocket error: {self.ws.exception()}')
+        raise ConnectionError(f'Websocket closed with code {self.ws.close_code}')
+
+    async def abort(self):
+        """Drops the connection without the closing handshake, which a dead connection would never complete"""
+
+        if self.session is not None:
+            await self.session.close()
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+        if self.session is not None:
+            await self.session.close()
+
+
+class ThreadedTransport:
+    """WebSocket transport on websocket-client, for installations without aiohttp
+
+    A reader thread blocks on the socket and hands frames over to the event loop through a queue,
+    so the event loop is never blocked by receiving.
+    """
+
+    def __init__(self):
+        self.ws = None
+        self.queue = None
+
+    async def open(self, url: str):
+        import websocket
+
+        loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        try:
+            self.ws = await loop.run_in_executor(None, websocket.create_connection, url)
+        except Exception as error:
+            raise ConnectionError(f'Websocket connection failed: {error!r}') from error
+
+        def read():
+            while True:
+                try:
+                    frame = self.ws.recv()
+                except Exception as error:
+                    frame = ConnectionError(f'Websocket closed: {error!r}')
+                try:
+                    loop.call_soon_threadsafe(self.queue.put_nowait, frame)
+                except RuntimeError:
+                    return  # The event loop is closed
+                if isinstance(frame, Exception):
+                    return
+
+        threading.Thread(target = read, daemon = True).start()
+
+    async def send(self, data: str):
+        await asyncio.get_running_loop().run_in_executor(None, self.ws.send, data)
+
+    async def recv(self) -> Union[bytes, str]:
+        frame = await self.queue.get()
+        if isinstance(frame, Exception):
+            raise frame
+        return frame
+
+    async def abort(self):
+        """Drops the connection without the closing handshake, which a dead connection would never complete"""
+
+        if self.ws is not None:
+            self.ws.abort()
+
+    async def close(self):
+        if self.ws is not None:
+            # Closing waits for the closing handshake, so it is done outside of the event loop
+            await asyncio.get_running_loop().run_in_executor(None, self.ws.close)
+
+
+def defaultTransport() -> type:
+    """Returns the aiohttp transport if aiohttp is installed, the threaded one otherwise"""
+
+    return AiohttpTransport if find_spec('aiohttp') else ThreadedTransport
+
+
+def frame(command: str, headers: dict, body: str = '') -> str:
+    lines = [command] + [f'{name}:{value}' for name, value in headers.items()]
+    return '\n'.join(lines) + '\n\n' + body + '\x00'
+
+
+def parseFrame(data: Union[bytes, str]) -> dict:
+    """Returns a frame as a dict of cmd, headers and body, as stomper.unpack_frame does"""
+
+    import stomper
+
+    return stomper.unpack_frame(data.decode() if isinstance(data, bytes) else data)
+
+
+def parseMessage(data: Union[bytes, str]) -> dict:
+    """Returns a MESSAGE frame as a dict of cmd, headers and body, other frames are parsed by parseFrame
+
+    Only the header block is split into lines, the body is sliced out of the frame as it is.
+    The body is bytes if the frame was received as bytes, json decoders take them without decoding to str first.
+    Frames with escaped or CRLF terminated headers are left to parseFrame.
+
+    .. code block:: python
+
+        parseMessage(b'MESSAGE\\ndestination:/v1/ticker\\nsubscription:0\\n\\n{"payload":[]}\\x00')
+
+        {'cmd': 'MESSAGE', 'headers': {'destination': '/v1/ticker', 'subscription': '0'}, 'body': b'{"payload":[]}'}
+
+    """
+
+    text = type(data) is str
+    end = data.find('\n\n' if text else b'\n\n')
+    if end < 0 or not data.startswith('MESSAGE\n' if text else b'MESSAGE\n'):
+        return parseFrame(data)
+
+    # Headers are a few short lines, so the block is decoded at once rather than header by header
+    block = data[8:end] if text else data[8:end].decode()
+    if '\\' in block or '\r' in block:
+        return parseFrame(data)
+    try:
+        headers = dict(line.split(':', 1) for line in block.split('\n'))
+    except ValueError:
+        return parseFrame(data)
+
+    # The body ends with a NUL octet, which may be followed by end of lines
+    stop = data.rfind('\x00' if text else b'\x00', end)
+    return {'cmd': 'MESSAGE', 'headers': headers, 'body': data[end + 2:stop if stop >= 0 else len(data)]}
+
+
+def negotiateHeartbeat(client: tuple, server: Optional[str]) -> tuple:
+    """Returns milliseconds between heart-beats (sent by the client, expected from the server), 0 for none
+
+    :param client: heart-beat of CONNECT frame, (client can send every, client wants to receive every)
+    :param server: heart-beat header of CONNECTED frame, "server can send every,server wants to receive every"
+    """
+
+    serverSends, serverReceives = (int(value) for value in (server or '0,0').split(','))
+    send = max(client[0], serverReceives) if client[0] and serverReceives else 0
+    receive = max(client[1], serverSends) if client[1] and serverSends else 0
+    return send, receive
+
+
+class StompError(Exception):
+    """ERROR frame of the server in reply to CONNECT, for example because of a bad signature, it is not retried"""
+
+
+class StompConnection:
+    """STOMP session over a WebSocket that runs entirely on the event loop
+
+    Receiving frames, sending frames and awaiting the consumer interleave with other coroutines.
+    When frames arrive faster than they are consumed, the connection still yields to the event loop
+    every time_slice seconds, so timers and other tasks are not starved by a busy feed.
+
+    A connection that receives nothing (not even heart-beats) for stale_timeout seconds is considered dead.
+    Lost connections are reopened with exponential jittered backoff, CONNECT headers are built again
+    (so signatures are fresh) and all current subscriptions are sent again. The backoff is only reset
+    once a reopened connection receives messages or heart-beats, so a server that accepts connections and
+    drops them at once (or refuses subscriptions with ERROR frames) is not reconnected to in a tight loop. Exceptions of on_message are not connection losses,
+    they are raised by run as they are, and so is StompError of a refused CONNECT.
+
+    :param url: websocket url of the STOMP endpoint
+    :param on_message: async function called with each message as a dict of cmd, headers and body
+    :param connect_headers: optional, function returning extra headers of CONNECT frame, for example signature headers
+    :param json_loads: optional, function decoding message bodies, bodies are passed as strings if not given
+    :param time_slice: seconds of consecutive processing after which the event loop is yielded to, defaults to 0.001
+    :param heartbeat: milliseconds between heart-beats (client sends, client expects), defaults to (10000, 10000),
+    (0, 0) disables heart-beats
+    :param stale_timeout: optional, seconds without frames after which the connection is reopened, defaults to
+    twice the negotiated interval of server heart-beats (connections are not checked if none were negotiated)
+    :param connect_timeout: seconds to wait for the websocket and the CONNECTED frame, defaults to 10, a connection
+    that is not established in time fails like a lost one
+    :param reconnect: defaults to True, if False a lost connection raises ConnectionError
+    :param reconnect_delay: seconds before the first reconnect, doubled after each failed attempt, defaults to 0.5
+    :param reconnect_max_delay: longest delay between reconnects in seconds, defaults to 30
+    :param max_reconnects: optional, consecutive failed reconnects after which ConnectionError is raised,
+    defaults to None (no limit)
+    :param transport: optional, transport class, defaults to AiohttpTransport if aiohttp is installed
+
+    .. code block:: python
+
+        connection = StompConnection(latoken.baseWS, on_message = consumer)
+        await connection.subscribe('/v1/book/620f2019-33c0-423b-8a9d-cde4d7f8ef7f/0c3a106d-bde3-4c13-a26e-3fd2394529e5')
+        await connection.run()
+
+    """
+
+    def __init__(self, url: str, on_message: Callable, connect_headers: Optional[Callable] = None,
+                 json_loads: Optional[Callable] = None, time_slice: float = 0.001, heartbeat: tuple = (10000, 10000),
+                 stale_timeout: Optional[float] = None, connect_timeout: float = 10, reconnect: bool = True,
+                 reconnect_delay: float = 0.5, reconnect_max_delay: float = 30, max_reconnects: Optional[int] = None,
+                 transport = None):
+        self.url = url
+        self.on_message = on_message
+        self.connect_headers = connect_headers
+        self.json_loads = json_loads
+        self.time_slice = time_slice
+        self.heartbeat = heartbeat
+        self.stale_timeout = stale_timeout
+        self.connect_timeout = connect_timeout
+        self.reconnect = reconnect
+        self.reconnect_delay = reconnect_delay
+        self.reconnect_max_delay = reconnect_max_delay
+        self.max_reconnects = max_reconnects
+        self.transport_class = transport or defaultTransport()
+        self.transport = None
+        self.subscriptions = dict()  # subscription id: destination
+        self.connected = False
+        self.last_received = None
+        self._delivered = False  # whether the current connection received messages or heart-beats
+        self._tasks = []
+        self._lost = None  # perf_counter of the moment the connection was found lost
+        self._metrics = {'connects': 0, 'reconnects': 0, 'failed_connects': 0, 'stale': 0, 'messages': 0,
+                         'last_error': None, 'recoveries': []}
+
+    async def _send(self, data: str):
+        if self.connected:
+            await self.transport.send(data)
+
+    async def subscribe(self, destination: str, subscription_id: Optional[str] = None) -> str:
+        """Subscribes to a destination, now if connected or once connected otherwise, returns the subscription id"""
+
+        subscription_id = str(len(self.subscriptions) if subscription_id is None else subscription_id)
+        self.subscriptions[subscription_id] = destination
+        await self._send(frame('SUBSCRIBE', {'id': subscription_id, 'destination': destination, 'ack': 'auto'}))
+        return subscription_id
+
+    async def unsubscribe(self, subscription_id: str):
+        self.subscriptions.pop(str(subscription_id), None)
+        await self._send(frame('UNSUBSCRIBE', {'id': subscription_id}))
+
+    # CONNECTION
+
+    async def _open(self):
+        # A server that accepts the socket but never answers CONNECT would otherwise keep the stream waiting forever
+        try:
+            connected = await asyncio.wait_for(self._connect(), self.connect_timeout)
+        except asyncio.TimeoutError:
+            raise ConnectionError(f'STOMP connection not established in {self.connect_timeout} seconds') from None
+        if connected['cmd'] == 'ERROR':
+            raise StompError(f'STOMP connection refused: {connected["headers"].get("message", connected["body"])}')
+
+        self.connected = True
+        self.last_received = perf_counter()
+        for subscription_id, destination in self.subscriptions.items():
+            await self.transport.send(frame('SUBSCRIBE', {'id': subscription_id, 'destination': destination,
+                                                          'ack': 'auto'}))
+
+        send, receive = negotiateHeartbeat(self.heartbeat, connected['headers'].get('heart-beat'))
+        stale_timeout = self.stale_timeout or (receive * 2 / 1000 if receive else None)
+        if send:
+            self._tasks.append(asyncio.ensure_future(self._sendHeartbeats(send / 1000)))
+        if stale_timeout:
+            self._tasks.append(asyncio.ensure_future(self._watch(stale_timeout)))
+
+    async def _connect(self) -> dict:
+        """Opens the websocket, sends CONNECT and returns the reply of the server"""
+
+        self.transport = self.transport_class()
+        await self.transport.open(self.url)
+
+        # Headers are built on every connect, so that signed timestamps are fresh after reconnects
+        headers = {'accept-version': '1.1', 'heart-beat': '{},{}'.format(*self.heartbeat)}
+        if self.connect_headers is not None:
+            headers.update(self.connect_headers())
+        await self.transport.send(frame('CONNECT', headers))
+        return parseFrame(await self.transport.recv())
+
+    async def _sendHeartbeats(self, interval: float):
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                await self.transport.send('\n')
+        except (OSError, RuntimeError):
+            pass  # A lost connection is found and reopened by the receiving side
+
+    async def _watch(self, stale_timeout: float):
+        """Dropping the connection once nothing was received for stale_timeout, so that receiving fails"""
+
+        while True:
+            await asyncio.sleep(min(stale_timeout / 4, 1))
+            if perf_counter() - self.last_received > stale_timeout:
+                self._metrics['stale'] += 1
+                await self.transport.abort()
+                return
+
+    async def _receive(self) -> OSError:
+        """Passes messages to on_message until the connection is lost, returns the error of the transport
+
+        Only receiving is guarded, so errors of on_message are raised even if they are OSErrors.
+        """
+
+        recv, on_message, json_loads = self.transport.recv, self.on_message, self.json_loads
+        sliceStarted = perf_counter()
+        while True:
+            try:
+                data = await recv()
+            except OSError as error:
+                return error
+            self.last_received = received = perf_counter()
+
+            # Heart-beats are bare end of lines
+            if len(data) < 3 and not data.strip():
+                self._delivered = True
+                continue
+
+            message = parseMessage(data)
+            self._metrics['messages'] += 1
+            if message['cmd'] == 'MESSAGE':
+                self._delivered = True
+
+            # Message body is a json string unless it is asked to be decoded, bytes are decoded by json_loads as they are
+            body = message['body']
+            if json_loads is not None and body:
+                message['body'] = json_loads(body)
+            elif type(body) is bytes:
+                message['body'] = body.decode()
+
+            await on_message(message)
+
+            # Frames that are already buffered are returned without suspending, so the loop is yielded to explicitly
+            if received - sliceStarted > self.time_slice:
+                await asyncio.sleep(0)
+                sliceStarted = perf_counter()
+
+    async def _disconnect(self, abort: bool = False):
+        self.connected = False
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        if self.transport is not None:
+            await (self.transport.abort() if abort else self.transport.close())
+
+    async def run(self):
+        """Connects, subscribes and passes messages to on_message until the consumer fails
+
+        Lost connections are reopened, ConnectionError is raised if reconnect is False or max_reconnects is reached,
+        StompError if the server refuses CONNECT.
+        """
+
+        delay = self.reconnect_delay
+        failures = 0
+        try:
+            while True:
+                try:
+                    await self._open()
+                except OSError as error:
+                    self._metrics['failed_connects'] += 1
+                    self._metrics['last_error'] = repr(error)
+                    await self._disconnect(abort = True)
+                    failures += 1
+                    if not self.reconnect or (self.max_reconnects is not None and failures > self.max_reconnects):
+                        raise
+                    self._lost = self._lost or perf_counter()
+                else:
+                    self._metrics['connects'] += 1
+                    if self._lost is not None:
+                        self._metrics['reconnects'] += 1
+                        self._metrics['recoveries'].append(perf_counter() - self._lost)
+                        self._lost = None
+                    self._delivered = False
+
+                    error = await self._receive()
+                    self._metrics['last_error'] = repr(error)
+                    self._lost = perf_counter()
+                    await self._disconnect(abort = True)
+                    if not self.reconnect:
+                        raise error
+
+                    # A session that delivered was healthy, one that was dropped or refused at once counts as a failure
+                    if self._delivered:
+                        delay = self.reconnect_delay
+                        failures = 0
+                    else:
+                        failures += 1
+                        if self.max_reconnects is not None and failures > self.max_reconnects:
+                            raise error
+
+                # Half of the delay is random, so that many clients don't reconnect all at once
+                await asyncio.sleep(delay / 2 + random.uniform(0, delay / 2))
+                delay = min(delay * 2, self.reconnect_max_delay)
+        finally:
+            await self._disconnect()
+
+    async def close(self):
+        await self._disconnect()
+
+    def getMetrics(self) -> dict:
+        """Returns counts of connects, reconnects and stale connections, and seconds it took to recover"""
+
+        recoveries = self._metrics['recoveries']
+        metrics = {name: value for name, value in self._metrics.items() if name != 'recoveries'}
+        metrics['connected'] = self.connected
+        metrics['subscriptions'] = len(self.subscriptions)
+        metrics['time_to_recover'] = {
+            'last': recoveries[-1],
+            'mean': sum(recoveries) / len(recoveries),
+            'max': max(recoveries)
+        } if recoveries else None
+        return metrics
+
+
+class StompPool:
+    """Subscriptions sharded across several StompConnections, with messages of all of them passed to one on_message
+
+    Each connection has its own socket and buffers, so a burst on a hot stream doesn't queue messages of
+    streams on other connections behind it. Subscription ids are the same whichever connection a stream is on.
+
+    New subscriptions go to the connection with the fewest subscriptions (balance = 'count') or the lowest
+    rate of messages (balance = 'rate'). With balance = 'rate' the streams are also rebalanced every
+    rebalance_interval seconds: while the busiest connection receives more than tolerance times the average,
+    one of its streams is moved to the least busy connection. A moved stream is subscribed on the new connection
+    first and unsubscribed from the old one once it delivers, so no messages are lost or duplicated.
+
+    :param url: websocket url of the STOMP endpoint
+    :param on_message: async function called with each message of every connection
+    :param connections: number of connections, defaults to 4
+    :param balance: 'count' or 'rate', defaults to 'count'
+    :param rebalance_interval: seconds between rebalances by rate, defaults to 10
+    :param tolerance: ratio of the busiest connection rate to the average that is left as it is, defaults to 1.5
+    :param max_moves: max number of streams moved per rebalance, defaults to 4
+    :param options: other StompConnection arguments, for example connect_headers or heartbeat
+
+    .. code block:: python
+
+        pool = StompPool(latoken.baseWS, on_message = consumer, connections = 8, balance = 'rate')
+        for pair in pairs:
+            await pool.subscribe(latoken.book_stream.format(**pair))
+        await pool.run()
+
+    """
+
+    def __init__(self, url: str, on_message: Callable, connections: int = 4, balance: str = 'count',
+                 rebalance_interval: float = 10, tolerance: float = 1.5, max_moves: int = 4, **options):
+        if balance not in ('count', 'rate'):
+            raise ValueError(f'Unknown balance: {balance}, should be "count" or "rate"')
+
+        self.on_message = on_message
+        self.balance = balance
+        self.rebalance_interval = rebalance_interval
+        self.tolerance = tolerance
+        self.max_moves = max_moves
+        self.connections = [StompConnection(url, self._dispatcher(index), **options) for index in range(connections)]
+        self.subscriptions = dict()  # subscription id: destination
+        self.assignment = dict()     # subscription id: index of the connection delivering it
+        self.moving = dict()         # subscription id: index of the connection it is moved to
+        self.counts = dict()         # subscription id: messages since the last rebalance
+        self.rates = dict()          # subscription id: messages per second measured by the last rebalance
+        self.moves = 0
+        self._unsubscribing = set()
+
+    def _dispatcher(self, index: int) -> Callable:
+        async def dispatch(message: dict):
+            subscription_id = message['headers'].get('subscription')
+            # ERROR and RECEIPT frames and messages of unknown subscriptions are passed on as a single connection would
+            if message['cmd'] != 'MESSAGE' or subscription_id not in self.subscriptions:
+                await self.on_message(message)
+                return
+            if self.assignment.get(subscription_id) != index:
+                if self.moving.get(subscription_id) != index:
+                    return  # The stream was moved away and this connection is not unsubscribed yet
+                self._moved(subscription_id, index)
+
+            self.counts[subscription_id] = self.counts.get(subscription_id, 0) + 1
+            await self.on_message(message)
+
+        return dispatch
+
+    def _moved(self, subscription_id: str, index: int):
+        previous = self.assignment[subscription_id]
+        self.assignment[subscription_id] = index
+        del self.moving[subscription_id]
+        self.moves += 1
+        task = asyncio.ensure_future(self.connections[previous].unsubscribe(subscription_id))
+        self._unsubscribing.add(task)
+        task.add_done_callback(self._unsubscribing.discard)
+
+    def _loads(self) -> list:
+        loads = [0.0] * len(self.connections)
+        for subscription_id, index in self.assignment.items():
+            loads[index] += self.rates.get(subscription_id, 0.0) if self.balance == 'rate' else 1
+        return loads
+
+    def _counts(self) -> list:
+        counts = [0] * len(self.connections)
+        for index in self.assignment.values():
+            counts[index] += 1
+        return counts
+
+    async def subscribe(self, destination: str, subscription_id: Optional[str] = None) -> str:
+        """Subscribes to a destination on the least busy connection, returns the subscription id"""
+
+        subscription_id = str(len(self.subscriptions) if subscription_id is None else subscription_id)
+        # Streams that were not measured yet have no rate, so they are spread by count among equally busy connections
+        loads, counts = self._loads(), self._counts()
+        index = min(range(len(self.connections)), key = lambda index: (loads[index], counts[index]))
+        self.subscriptions[subscription_id] = destination
+        self.assignment[subscription_id] = index
+        await self.connections[index].subscribe(destination, subscription_id)
+        return subscription_id
+
+    async def unsubscribe(self, subscription_id: str):
+        subscription_id = str(subscription_id)
+        self.subscriptions.pop(subscription_id, None)
+        self.rates.pop(subscription_id, None)
+        self.counts.pop(subscription_id, None)
+        for index in (self.assignment.pop(subscription_id, None), self.moving.pop(subscription_id, None)):
+            if index is not None:
+                await self.connections[index].unsubscribe(subscription_id)
+
+    async def rebalance(self, elapsed: float):
+        """Measures rates of streams over the elapsed seconds and moves streams off the busiest connections"""
+
+        self.rates = {subscription_id: count / elapsed for subscription_id, count in self.counts.items()}
+        self.counts = dict()
+
+        loads = self._loads()
+        average = sum(loads) / len(loads)
+        for _ in range(self.max_moves):
+            move = self._findMove(loads, average)
+            if move is None:
+                break
+
+            subscription_id, busiest, idlest = move
+            rate = self.rates.get(subscription_id, 0.0)
+            loads[busiest] -= rate
+            loads[idlest] += rate
+            self.moving[subscription_id] = idlest
+            await self.connections[idlest].subscribe(self.subscriptions[subscription_id], subscription_id)
+
+    def _findMove(self, loads: list, average: float) -> Optional[tuple]:
+        """Returns (subscription id, from, to) of a stream to move to the least busy connection, None if none is worth it"""
+
+        idlest = loads.index(min(loads))
+        for busiest in sorted(range(len(loads)), key = lambda index: -loads[index]):
+            if not average or loads[busiest] <= average * self.tolerance:
+                return None
+
+            # The stream that brings both connections closest to each other, it is never worth moving a hotter one,
+            # so a connection with a single hot stream is left as it is
+            gap = loads[busiest] - loads[idlest]
+            candidates = [(abs(gap / 2 - self.rates.get(subscription_id, 0.0)), subscription_id)
+                          for subscription_id, index in self.assignment.items()
+                          if index == busiest and subscription_id not in self.moving
+                          and self.rates.get(subscription_id, 0.0) < gap]
+            if candidates:
+                return min(candidates)[1], busiest, idlest
+        return None
+
+    async def _rebalancing(self):
+        while True:
+            started = perf_counter()
+            await asyncio.sleep(self.rebalance_interval)
+            await self.rebalance(perf_counter() - started)
+
+    async def run(self):
+        """Runs all connections until one of them fails, the others are closed then"""
+
+        tasks = [asyncio.ensure_future(connection.run()) for connection in self.connections]
+        if self.balance == 'rate':
+            tasks.append(asyncio.ensure_future(self._rebalancing()))
+
+        try:
+            done, _ = await asyncio.wait(tasks, return_when = asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions = True)
+
+    async def close(self):
+        for connection in self.connections:
+            await connection.close()
+
+    def getMetrics(self) -> dict:
+        """Returns metrics of each connection with its subscriptions and rate of messages, and number of moves"""
+
+        connections = []
+        for index, connection in enumerate(self.connections):
+            metrics = connection.getMetrics()
+            metrics['rate'] = sum(self.rates.get(subscription_id, 0.0)
+                                  for subscription_id, owner in self.assignment.items() if owner == index)
+            connections.append(metrics)
+
+        return {
+            'connections': connections,
+            'subscriptions': len(self.subscriptions),
+            'moves': self.moves,
+            'hottest': sorted(self.rates.items(), key = lambda item: -item[1])[:10]
+        }
+
+
+class StreamRouter:
+    """Dispatch table of subscriptions, each message is passed to the handler of its subscription id
+
+    The router is the on_message of a StompConnection or StompPool. Handlers are looked up by the subscription
+    header in a dict, so consumers don't compare subscription ids of every message themselves.
+    A decoder of a subscription is called with the json decoded body and its result replaces the body,
+    for example payloadDecoder or bookDecoder of latoken.models. Messages of subscriptions without
+    a handler are passed to on_message, or dropped if there is none.
+
+    :param on_message: optional, async function called with messages of subscriptions without a handler
+    :param json_loads: optional, function decoding bodies for decoders, defaults to the client decoder
+
+    .. code block:: python
+
+        router = StreamRouter(on_message = consumer)
+        router.add('0', handler = onBook, decoder = bookDecoder())
+        router.add('1', handler = onTrades)
+        connection = StompConnection(latoken.baseWS, router)
+
+    """
+
+    def __init__(self, on_message: Optional[Callable] = None, json_loads: Optional[Callable] = None):
+        from latoken.decoder import loads
+
+        self.on_message = on_message
+        self.json_loads = json_loads or loads
+        self.routes = dict()  # subscription id: (handler, decoder)
+
+    def add(self, subscription_id: Union[int, str], handler: Optional[Callable] = None,
+            decoder: Optional[Callable] = None):
+        self.routes[str(subscription_id)] = (handler, decoder)
+
+    def remove(self, subscription_id: Union[int, str]):
+        self.routes.pop(str(subscription_id), None)
+
+    async def __call__(self, message: dict):
+        handler, decoder = self.routes.get(message['headers'].get('subscription'), (None, None))
+        if decoder is not None and message['body']:
+            body = message['body']
+            message['body'] = decoder(self.json_loads(body) if isinstance(body, (bytes, str)) else body)
+
+        handler = handler or self.on_message
+        if handler is not None:
+            await handler(message)
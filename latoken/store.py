@@ -0,0 +1,213 @@
+import json
+import sqlite3
+from typing import TYPE_CHECKING, Optional
+
+from latoken.enums import ORDER_STATUS_PLACED, TRANSFER_STATUS_PENDING, TRANSFER_STATUS_UNVERIFIED
+
+if TYPE_CHECKING:
+    from latoken.client import LatokenClient
+
+
+class HistoryStore:
+    """Local SQLite copy of user trades, orders and transfers that is synced incrementally
+
+    The newest timestamp synced is kept per stream, so each sync only requests records newer than it.
+    Stored orders and transfers that are not final yet are requested again on each sync however old they are,
+    orders by id and transfers by paging back to the oldest of them.
+
+    :param path: SQLite database file, ':memory:' keeps the store in memory
+    :param client: LatokenClient with api key and secret
+
+    .. code block:: python
+
+        store = HistoryStore('history.db', latoken)
+        store.sync()
+        trades = store.getTrades(pair = '92151d82-df98-4d88-9a4d-284fa9eca49f/0c3a106d-bde3-4c13-a26e-3fd2394529e5',
+                                 since = 1624373391929)
+
+    """
+
+    schema = '''
+        CREATE TABLE IF NOT EXISTS trades (
+            id TEXT PRIMARY KEY, baseCurrency TEXT, quoteCurrency TEXT, timestamp INTEGER, data TEXT);
+        CREATE INDEX IF NOT EXISTS trades_pair ON trades (baseCurrency, quoteCurrency, timestamp);
+        CREATE INDEX IF NOT EXISTS trades_timestamp ON trades (timestamp);
+
+        CREATE TABLE IF NOT EXISTS orders (
+            id TEXT PRIMARY KEY, baseCurrency TEXT, quoteCurrency TEXT, status TEXT, timestamp INTEGER, data TEXT);
+        CREATE INDEX IF NOT EXISTS orders_pair ON orders (baseCurrency, quoteCurrency, timestamp);
+        CREATE INDEX IF NOT EXISTS orders_timestamp ON orders (timestamp);
+
+        CREATE TABLE IF NOT EXISTS transfers (
+            id TEXT PRIMARY KEY, currency TEXT, timestamp INTEGER, data TEXT);
+        CREATE INDEX IF NOT EXISTS transfers_currency ON transfers (currency, timestamp);
+        CREATE INDEX IF NOT EXISTS transfers_timestamp ON transfers (timestamp);
+
+        CREATE TABLE IF NOT EXISTS sync_state (stream TEXT PRIMARY KEY, timestamp INTEGER);
+    '''
+
+    # Statuses of records that can still change
+    open_order_statuses = (ORDER_STATUS_PLACED,)
+    open_transfer_statuses = (TRANSFER_STATUS_UNVERIFIED, TRANSFER_STATUS_PENDING)
+
+    def __init__(self, path: str, client: 'LatokenClient'):
+        self.client = client
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(self.schema)
+
+    def close(self):
+        self.connection.close()
+
+    # SYNC
+
+    def _highWater(self, stream: str) -> Optional[int]:
+        row = self.connection.execute('SELECT timestamp FROM sync_state WHERE stream = ?', (stream,)).fetchone()
+        return row[0] if row else None
+
+    def _setHighWater(self, stream: str, records: list, previous: Optional[int]):
+        timestamps = [record['timestamp'] for record in records]
+        if previous is not None:
+            timestamps.append(previous)
+        if timestamps:
+            self.connection.execute('INSERT OR REPLACE INTO sync_state VALUES (?, ?)', (stream, max(timestamps)))
+
+    def syncTrades(self) -> int:
+        """Stores user trades newer than the last synced one, returns number of trades received"""
+
+        since = self._highWater('trades')
+        trades = list(self.client.iterTrades(user = True, since = since))
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO trades VALUES (?, ?, ?, ?, ?)',
+                [(trade['id'], trade['baseCurrency'], trade['quoteCurrency'], trade['timestamp'], json.dumps(trade))
+                 for trade in trades]
+            )
+            self._setHighWater('trades', trades, since)
+        return len(trades)
+
+    def syncOrders(self) -> int:
+        """Stores user orders newer than the last synced one, returns number of orders received
+
+        Stored orders that are still open are requested by id and updated as well
+        """
+
+        since = self._highWater('orders')
+        orders = list(self.client.iterOrders(since = since))
+
+        # Orders that were open when stored can still be filled or cancelled, so they are requested by id
+        received = {order['id'] for order in orders}
+        stale = [row[0] for row in self.connection.execute(
+            f'SELECT id FROM orders WHERE status IN ({", ".join("?" * len(self.open_order_statuses))})',
+            self.open_order_statuses
+        ) if row[0] not in received]
+        if stale:
+            responses = self.client._pipeline(self.client.getOrders, [{'order_id': order_id} for order_id in stale])
+            # Failed requests and error responses (of rate limits or orders that are gone) are left as they are
+            responses = [self.client._decode(response) for response in responses if not isinstance(response, Exception)]
+            orders += [response for response in responses
+                       if isinstance(response, dict) and 'id' in response and 'status' in response]
+
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO orders VALUES (?, ?, ?, ?, ?, ?)',
+                [(order['id'], order['baseCurrency'], order['quoteCurrency'], order['status'], order['timestamp'],
+                  json.dumps(order)) for order in orders]
+            )
+            self._setHighWater('orders', orders, since)
+        return len(orders)
+
+    def syncTransfers(self) -> int:
+        """Stores user transfers newer than the last synced one, returns number of transfers received
+
+        Pages are requested back to the oldest stored transfer that is not final yet, so it is updated as well
+        """
+
+        since = self._highWater('transfers')
+        # Transfers can only be requested by pages, so pages go back to the oldest transfer that is not final yet
+        until = since
+        if since is not None:
+            row = self.connection.execute(
+                f'SELECT MIN(timestamp) FROM transfers WHERE json_extract(data, \'$.status\') IN '
+                f'({", ".join("?" * len(self.open_transfer_statuses))})', self.open_transfer_statuses
+            ).fetchone()
+            if row[0] is not None:
+                until = min(since, row[0])
+
+        transfers = []
+        # Transfers are paginated from the most recent, so pages stop being requested once the synced ones are reached
+        for transfer in self.client.iterTransfers():
+            if until is not None and transfer['timestamp'] < until:
+                break
+            transfers.append(transfer)
+
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO transfers VALUES (?, ?, ?, ?)',
+                [(transfer['id'], transfer['currency'], transfer['timestamp'], json.dumps(transfer))
+                 for transfer in transfers]
+            )
+            self._setHighWater('transfers', transfers, since)
+        return len(transfers)
+
+    def sync(self) -> dict:
+        """Syncs all streams, returns number of records received per stream"""
+
+        return {
+            'trades': self.syncTrades(),
+            'orders': self.syncOrders(),
+            'transfers': self.syncTransfers()
+        }
+
+    # QUERIES
+
+    def _query(self, table: str, filters: dict, since: Optional[int], until: Optional[int]) -> list:
+        conditions = [f'{column} = ?' for column in filters]
+        params = list(filters.values())
+        if since is not None:
+            conditions.append('timestamp >= ?')
+            params.append(since)
+        if until is not None:
+            conditions.append('timestamp < ?')
+            params.append(until)
+
+        where = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+        rows = self.connection.execute(f'SELECT data FROM {table}{where} ORDER BY timestamp DESC', params)
+        return [json.loads(row[0]) for row in rows]
+
+    def _pairFilters(self, pair: Optional[str]) -> dict:
+        if not pair:
+            return {}
+        currency, quote = pair.split('/')
+        return {'baseCurrency': currency, 'quoteCurrency': quote}
+
+    def getTrades(self, pair: Optional[str] = None, since: Optional[int] = None, until: Optional[int] = None) -> list:
+        """Returns stored user trades from the most recent to the least recent
+
+        :param pair: optional, should consist of currency ids (format ***/***)
+        :param since: optional, timestamp in milliseconds (included)
+        :param until: optional, timestamp in milliseconds (not included)
+        """
+
+        return self._query('trades', self._pairFilters(pair), since, until)
+
+    def getOrders(self, pair: Optional[str] = None, status: Optional[str] = None, since: Optional[int] = None,
+                  until: Optional[int] = None) -> list:
+        """Returns stored user orders from the most recent to the least recent
+
+        :param pair: optional, should consist of currency ids (format ***/***)
+        :param status: optional, for example ORDER_STATUS_CLOSED
+        """
+
+        filters = self._pairFilters(pair)
+        if status:
+            filters['status'] = status
+        return self._query('orders', filters, since, until)
+
+    def getTransfers(self, currency: Optional[str] = None, since: Optional[int] = None,
+                     until: Optional[int] = None) -> list:
+        """Returns stored user transfers from the most recent to the least recent
+
+        :param currency: optional, currency id
+        """
+
+        return self._query('transfers', {'currency': currency} if currency else {}, since, until)
@@ -15,6 +15,12 @@ setup(
     license = 'MIT',
     url = 'https://github.com/LATOKEN/latoken-api-v2-python-client',
     install_requires = ['requests', 'stomper', 'websocket-client'],
+    extras_require = {
+        'async': ['aiohttp'],
+        'fast': ['orjson'],
+        'numpy': ['numpy'],
+        'brotli': ['brotli']
+    },
     keywords = 'latoken exchange rest websockets api crypto bitcoin trading',
     classifiers = [
         'Intended Audience :: Developers',